@@ -0,0 +1,194 @@
+"""
+Hour/day order rollups behind `GET /api/admin/analytics`.
+Run: python analytics.py      # rebuild every rollup from orders + order_events
+
+`order_rollups` has one row per (granularity, restaurant, bucket). Each event
+lands in the bucket of the time it happened (UTC):
+- placement: orders, revenue, discount, restaurant fee;
+- delivery: delivered, delivered revenue;
+- cancellation or rejection: cancelled, cancelled revenue.
+
+`orders.set_status` records the deltas and each flush upserts them, the same
+way as the platform counters in stats.py. Queries then read at most one row
+per restaurant and bucket instead of scanning `orders`. Per-pin-code figures
+are sums over the restaurants in that pin code.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+from typing import Optional
+from sqlalchemy import and_, delete, event, func, insert, select
+from sqlalchemy.orm import Session
+import models
+from stats import upsert_adding
+
+GRANULARITIES = ("hour", "day")
+MEASURES = (
+    "orders", "revenue", "discount", "restaurant_fee",
+    "delivered", "delivered_revenue", "cancelled", "cancelled_revenue",
+)
+CANCELLED_STATUSES = ("Cancelled", "Rejected")
+DELTAS_KEY = "rollup_deltas"
+REBUILD_BATCH_SIZE = 10000
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _measures(status: str, previous: Optional[str], total: float, discount: float, fee: float) -> dict:
+    if previous is None:
+        return {"orders": 1, "revenue": total, "discount": discount, "restaurant_fee": fee}
+    if status == "Delivered":
+        return {"delivered": 1, "delivered_revenue": total}
+    if status in CANCELLED_STATUSES:
+        return {"cancelled": 1, "cancelled_revenue": total}
+    return {}
+
+
+def _add(rollups: dict, restaurant_id: int, pin_code: str, at: datetime, measures: dict):
+    for granularity in GRANULARITIES:
+        key = (granularity, restaurant_id, bucket_start(at, granularity))
+        row = rollups.get(key)
+        if row is None:
+            row = rollups[key] = {"pin_code": pin_code, **dict.fromkeys(MEASURES, 0)}
+        for name, value in measures.items():
+            row[name] += value
+
+
+def _rows(rollups: dict) -> list[dict]:
+    return [
+        {"granularity": g, "restaurant_id": rid, "bucket": bucket, **row}
+        for (g, rid, bucket), row in rollups.items()
+    ]
+
+
+def record_status_change(db: Session, order: models.Order, previous: Optional[str], status: str, at: datetime):
+    """Queue the rollup deltas of a placement or transition on `db`."""
+    measures = _measures(
+        status, previous, order.total_amount or 0.0, order.discount_amount or 0.0, order.restaurant_fee or 0.0,
+    )
+    if measures:
+        # Usually already in the identity map (checkout, status updates)
+        pin_code = db.get(models.Restaurant, order.restaurant_id).pin_code
+        _add(db.info.setdefault(DELTAS_KEY, {}), order.restaurant_id, pin_code, at, measures)
+
+
+@event.listens_for(Session, "after_flush")
+def _write_deltas(session: Session, _flush_context):
+    rollups = session.info.pop(DELTAS_KEY, None)
+    if rollups:
+        conn = session.connection()
+        r = models.OrderRollup
+        stmt = upsert_adding(
+            conn.dialect.name, r, [r.granularity, r.restaurant_id, r.bucket],
+            [getattr(r, name) for name in MEASURES],
+        )
+        conn.execute(stmt.values(_rows(rollups)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session: Session):
+    session.info.pop(DELTAS_KEY, None)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every rollup row from the order history (caller commits).
+
+    Outcomes are timed by their order event; orders from before the event log
+    fall back to delivered_at, then created_at. Orders are summed per hour in
+    flat lists and days are summed from the hours, which keeps large histories
+    cheap. Returns the number of rows.
+    """
+    o, r, e = models.Order, models.Restaurant, models.OrderEvent
+    conn = db.connection()  # Core rows: no ORM row processing for plain columns
+    pins = dict(conn.execute(select(r.id, r.pin_code)).all())
+    hourly = defaultdict(lambda: [0] * len(MEASURES))  # (restaurant id, hour) → MEASURES
+    orders, revenue, discount, fee, delivered, delivered_revenue, cancelled, cancelled_revenue = range(len(MEASURES))
+
+    placed = (
+        select(o.restaurant_id, o.created_at, o.total_amount, o.discount_amount, o.restaurant_fee)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    for rid, created, total, disc, rfee in conn.execute(placed):
+        m = hourly[rid, bucket_start(created, "hour")]
+        m[orders] += 1
+        m[revenue] += total or 0.0
+        m[discount] += disc or 0.0
+        m[fee] += rfee or 0.0
+
+    outcome = (
+        select(o.restaurant_id, o.order_status, o.total_amount, func.coalesce(e.ts, o.delivered_at, o.created_at))
+        .outerjoin(e, and_(e.order_id == o.id, e.to_status == o.order_status))
+        .where(o.order_status.in_(("Delivered", *CANCELLED_STATUSES)))
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    for rid, status, total, at in conn.execute(outcome):
+        m = hourly[rid, bucket_start(at, "hour")]
+        count, amount = (delivered, delivered_revenue) if status == "Delivered" else (cancelled, cancelled_revenue)
+        m[count] += 1
+        m[amount] += total or 0.0
+
+    daily = defaultdict(lambda: [0] * len(MEASURES))
+    for (rid, hour), m in hourly.items():
+        day = daily[rid, bucket_start(hour, "day")]
+        for i, value in enumerate(m):
+            day[i] += value
+
+    conn.execute(delete(models.OrderRollup))
+    rows = (
+        {"granularity": granularity, "restaurant_id": rid, "bucket": bucket, "pin_code": pins[rid],
+         **dict(zip(MEASURES, m))}
+        for granularity, buckets in (("hour", hourly), ("day", daily))
+        for (rid, bucket), m in buckets.items()
+    )
+    count = 0
+    while chunk := list(islice(rows, REBUILD_BATCH_SIZE)):
+        conn.execute(insert(models.OrderRollup), chunk)
+        count += len(chunk)
+    return count
+
+
+def query_rollups(
+    db: Session,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    restaurant_id: Optional[int] = None,
+    pin_code: Optional[str] = None,
+    group_by: Optional[str] = None,
+) -> list[dict]:
+    """Totals per bucket in [start, end), optionally split by restaurant or pin code."""
+    r = models.OrderRollup
+    group_cols = {"restaurant": [r.restaurant_id], "pin_code": [r.pin_code]}.get(group_by, [])
+    stmt = (
+        select(r.bucket, *group_cols, *(func.sum(getattr(r, name)).label(name) for name in MEASURES))
+        .where(r.granularity == granularity, r.bucket >= bucket_start(start, granularity), r.bucket < end)
+        .group_by(r.bucket, *group_cols)
+        .order_by(r.bucket, *group_cols)
+    )
+    if restaurant_id is not None:
+        stmt = stmt.where(r.restaurant_id == restaurant_id)
+    if pin_code is not None:
+        stmt = stmt.where(r.pin_code == pin_code)
+    return [row._asdict() for row in db.execute(stmt)]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    import migrate
+
+    migrate.upgrade()
+    db = SessionLocal()
+    try:
+        count = rebuild_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"✓ Rebuilt {count} rollup rows")
@@ -1,18 +1,36 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from passlib.hash import pbkdf2_sha256
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from database import get_async_db
 import models
 
 SECRET_KEY = "pindropeats-super-secret-key-2026"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
 
+# Short-lived tickets for the notification stream, whose URL (and so the
+# ticket) ends up in access logs and browser history
+STREAM_TICKET_SCOPE = "notification-stream"
+STREAM_TICKET_EXPIRE_SECONDS = 60
+
+STALE_USERS_KEY = "auth_stale_users"
+
+# Decoded principals are cached per token so the hot path (every request,
+# including the notification poll) skips the JWT decode and the users lookup.
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "4096"))
+
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 security = HTTPBearer()
 
@@ -43,23 +61,145 @@ def decode_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> models.User:
-    payload = decode_token(credentials.credentials)
+def create_stream_ticket(user_id: int) -> str:
+    return create_access_token(
+        {"user_id": user_id, "scope": STREAM_TICKET_SCOPE},
+        timedelta(seconds=STREAM_TICKET_EXPIRE_SECONDS),
+    )
+
+
+class CurrentUser(NamedTuple):
+    """The authenticated user's identity, detached from any DB session."""
+    id: int
+    name: str
+    email: str
+    role: str
+    pin_code: str
+
+
+_token_cache: "OrderedDict[str, tuple[float, CurrentUser]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+# Bumped by invalidate_user. A principal is only cached if its user's
+# generation did not move while the row was being loaded, so a load racing
+# with a committed change cannot re-cache the old row for the full TTL.
+_user_generations: "defaultdict[int, int]" = defaultdict(int)
+
+
+def _cache_get(token: str) -> Optional[CurrentUser]:
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return principal
+
+
+def _user_generation(user_id) -> int:
+    with _token_cache_lock:
+        return _user_generations[user_id]
+
+
+def _cache_put(token: str, principal: CurrentUser, token_exp: Optional[float], generation: int):
+    expires_at = time.time() + TOKEN_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, token_exp)
+    with _token_cache_lock:
+        if _user_generations[principal.id] != generation:
+            return
+        _token_cache[token] = (expires_at, principal)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _token_cache.popitem(last=False)
+
+
+def invalidate_user(user_id: int):
+    """Drop cached principals for a user (role, pin code or profile changed)."""
+    with _token_cache_lock:
+        _user_generations[user_id] += 1
+        stale = [t for t, (_, p) in _token_cache.items() if p.id == user_id]
+        for token in stale:
+            del _token_cache[token]
+
+
+def _queue_invalidation(target: models.User):
+    # Applied once the change commits: dropping the cache at flush would let a
+    # concurrent request re-cache the old, still-committed row until the TTL.
+    object_session(target).info.setdefault(STALE_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(models.User, "after_update")
+def _user_updated(_mapper, _connection, target):
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in CurrentUser._fields):
+        _queue_invalidation(target)
+
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(_mapper, _connection, target):
+    _queue_invalidation(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    for user_id in session.info.pop(STALE_USERS_KEY, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop(STALE_USERS_KEY, None)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> CurrentUser:
+    """Resolve a bearer token to its user, via the principal cache."""
+    principal = _cache_get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_token(token)
+    if "scope" in payload:
+        # A stream ticket is not an access token
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    generation = _user_generation(payload.get("user_id"))
+    principal = await _load_principal(payload, db)
+    _cache_put(token, principal, payload.get("exp"), generation)
+    return principal
+
+
+async def authenticate_stream_ticket(ticket: str, db: AsyncSession) -> CurrentUser:
+    """Resolve a ticket from `create_stream_ticket`; access tokens are refused."""
+    payload = decode_token(ticket)
+    if payload.get("scope") != STREAM_TICKET_SCOPE:
+        raise HTTPException(status_code=401, detail="Invalid stream ticket")
+    return await _load_principal(payload, db)
+
+
+async def _load_principal(payload: dict, db: AsyncSession) -> CurrentUser:
     user_id: int = payload.get("user_id")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    return CurrentUser(
+        id=user.id, name=user.name, email=user.email, role=user.role, pin_code=user.pin_code,
+    )
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    return await authenticate_token(credentials.credentials, db)
 
 
 def require_role(*roles):
     """Dependency factory: require one of the given roles."""
-    def role_checker(current_user: models.User = Depends(get_current_user)):
+    async def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -67,10 +207,3 @@ def require_role(*roles):
             )
         return current_user
     return role_checker
-
-
-def create_notification(db: Session, user_id: int, message: str):
-    """Helper to create a notification for a user."""
-    notif = models.Notification(user_id=user_id, message=message)
-    db.add(notif)
-    db.commit()
@@ -0,0 +1,106 @@
+"""
+In-memory catalog cache for customer browsing.
+
+Restaurants (per pin code) and menus (per restaurant) change only through the
+admin restaurant endpoints and the owner dish endpoints, which invalidate the
+affected keys after committing. Each entry carries a content-derived ETag so
+clients revalidating with If-None-Match get a 304 instead of the payload.
+
+Every key has a version that invalidation bumps; a load that raced with an
+invalidation is served but not stored. With several workers each process holds
+its own copy, so the TTL bounds how long another worker can serve stale data.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+from fastapi import Response
+import geo
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+
+
+def make_etag(payload) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def conditional_response(response: Response, etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """Set caching headers; return a 304 response if the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+class CatalogCache:
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[float, str, object]] = {}
+        self._versions: dict[Hashable, int] = {}
+
+    def _lookup(self, key: Hashable):
+        """Return `(hit, version)`; hit is `(etag, payload)` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return (entry[1], entry[2]), None
+            return None, self._versions.get(key, 0)
+
+    def _store(self, key: Hashable, version: int, payload) -> tuple[str, object]:
+        etag = make_etag(payload)
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = (time.monotonic() + self.ttl, etag, payload)
+        return etag, payload
+
+    def get(self, key: Hashable, loader: Callable[[], object]) -> tuple[str, object]:
+        """Return `(etag, payload)` for key, calling `loader` on a miss.
+
+        `loader` must return a JSON-serialisable payload.
+        """
+        hit, version = self._lookup(key)
+        if hit:
+            return hit
+        return self._store(key, version, loader())
+
+    async def get_async(self, key: Hashable, loader: Callable[[], Awaitable[object]]) -> tuple[str, object]:
+        """`get` with a coroutine loader."""
+        hit, version = self._lookup(key)
+        if hit:
+            return hit
+        return self._store(key, version, await loader())
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+
+catalog = CatalogCache()
+
+
+def restaurants_key(pin_code: str):
+    return ("restaurants", pin_code)
+
+
+def menu_key(restaurant_id: int):
+    return ("menu", restaurant_id)
+
+
+def invalidate_restaurant(restaurant_id: int, *pin_codes: str):
+    """Drop a restaurant's menu and every browse list that can show it."""
+    browse_pins = {browsing for p in pin_codes for browsing in geo.browsed_from(p)}
+    catalog.invalidate(menu_key(restaurant_id), *(restaurants_key(p) for p in browse_pins))
@@ -0,0 +1,271 @@
+"""
+Delivery-partner dispatch with per-pin-code availability pools.
+
+Each pin code keeps its available partners in an ordered set: a claim takes the
+partner at the front and a partner who becomes free again joins the back, so
+work is spread round-robin instead of always landing on the lowest id.
+
+The database stays the source of truth. A claim only succeeds if its
+conditional `UPDATE ... WHERE availability` matches a row, which keeps two
+concurrent requests (or two workers) from taking the same partner. Pool changes
+that depend on a write are applied after the session commits and a rollback
+returns claimed partners to the front of their queue. When a pool is empty the
+pin code is looked up in the table (indexed), which also covers partners freed
+by another worker.
+
+A pin code with nobody free borrows from its nearest neighbours
+(`geo.dispatch_area`), closest first.
+
+`claim_partners` serves batch dispatch: it ranks a pin code's pool by how many
+orders each partner was assigned in the last DISPATCH_BALANCE_WINDOW_HOURS
+(queue position breaks ties, so the longest idle goes first) and claims the
+whole batch with one UPDATE. The window keeps the ranking to the current
+shift and the count to an index range per partner, however long their history.
+"""
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import geo
+import metrics
+import models
+
+DISPATCH_BALANCE_WINDOW_HOURS = float(os.getenv("DISPATCH_BALANCE_WINDOW_HOURS", "12"))
+
+PENDING_KEY = "dispatch_pending"
+CLAIMED_KEY = "dispatch_claimed"
+
+
+class PartnerRef(NamedTuple):
+    id: int
+    user_id: int
+    pin_code: str
+
+
+class DispatchPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues: dict[str, OrderedDict[int, PartnerRef]] = defaultdict(OrderedDict)
+
+    def rebuild(self, db: Session):
+        """Reload every pin code's queue from the available partners."""
+        rows = db.execute(
+            select(models.DeliveryPartner.id, models.DeliveryPartner.user_id, models.DeliveryPartner.pin_code)
+            .where(models.DeliveryPartner.availability == True)
+            .order_by(models.DeliveryPartner.id)
+        ).all()
+        queues = defaultdict(OrderedDict)
+        for row in rows:
+            queues[row.pin_code][row.id] = PartnerRef(*row)
+        with self._lock:
+            self._queues = queues
+
+    def pop(self, pin_code: str) -> Optional[PartnerRef]:
+        with self._lock:
+            queue = self._queues.get(pin_code)
+            if queue:
+                return queue.popitem(last=False)[1]
+            return None
+
+    def snapshot(self, pin_code: str) -> list[PartnerRef]:
+        with self._lock:
+            return list(self._queues.get(pin_code, {}).values())
+
+    def take(self, pin_code: str, ids: list[int]) -> list[PartnerRef]:
+        """Remove and return the partners in `ids` that are still queued, in that order."""
+        with self._lock:
+            queue = self._queues.get(pin_code, {})
+            return [queue.pop(i) for i in ids if i in queue]
+
+    def push(self, ref: PartnerRef, front: bool = False):
+        with self._lock:
+            queue = self._queues[ref.pin_code]
+            queue[ref.id] = ref
+            queue.move_to_end(ref.id, last=not front)
+
+    def remove(self, partner_id: int, pin_code: str):
+        with self._lock:
+            self._queues.get(pin_code, {}).pop(partner_id, None)
+
+    def available(self, pin_code: str) -> int:
+        with self._lock:
+            return len(self._queues.get(pin_code, ()))
+
+    def counts(self) -> dict[str, int]:
+        """Queued partners per pin code."""
+        with self._lock:
+            return {pin_code: len(queue) for pin_code, queue in self._queues.items()}
+
+
+pool = DispatchPool()
+
+DISPATCH_FAILURES = metrics.counter(
+    "pindrop_dispatch_failures_total", "Orders that could not go out for delivery: no partner free nearby",
+)
+metrics.gauge_callback(
+    "pindrop_partners_available", "Free delivery partners queued in this worker's pool", ("pin_code",),
+    lambda: {(pin_code,): n for pin_code, n in pool.counts().items()},
+)
+
+
+def rebuild_pool():
+    db = SessionLocal()
+    try:
+        pool.rebuild(db)
+    finally:
+        db.close()
+
+
+def _mark_busy(db: Session, partner_id: int) -> bool:
+    result = db.execute(
+        update(models.DeliveryPartner)
+        .where(models.DeliveryPartner.id == partner_id, models.DeliveryPartner.availability == True)
+        .values(availability=False)
+    )
+    return result.rowcount == 1
+
+
+def claim_partner(db: Session, pin_code: str) -> Optional[PartnerRef]:
+    """Mark the next available partner serving `pin_code` busy within `db`'s transaction.
+
+    Returns None if nobody is available there or in the neighbouring pin codes.
+    """
+    for pin in geo.dispatch_area(pin_code):
+        ref = _claim_in_pin(db, pin)
+        if ref:
+            return ref
+    return None
+
+
+def _claim_in_pin(db: Session, pin_code: str) -> Optional[PartnerRef]:
+    while True:
+        ref = pool.pop(pin_code)
+        if ref is None:
+            break
+        if _mark_busy(db, ref.id):
+            db.info.setdefault(CLAIMED_KEY, []).append(ref)
+            return ref
+        # Went offline or was taken by another worker; it re-joins when freed
+
+    row = db.execute(
+        select(models.DeliveryPartner.id, models.DeliveryPartner.user_id, models.DeliveryPartner.pin_code)
+        .where(models.DeliveryPartner.pin_code == pin_code, models.DeliveryPartner.availability == True)
+        .order_by(models.DeliveryPartner.id)
+        .limit(1)
+    ).first()
+    if row and _mark_busy(db, row.id):
+        return PartnerRef(*row)
+    return None
+
+
+def claim_partners(db: Session, pin_code: str, count: int) -> list[PartnerRef]:
+    """Claim up to `count` partners serving `pin_code`, least-loaded first.
+
+    Neighbouring pin codes are only used once `pin_code` runs out. Returns the
+    partners in assignment order; fewer than `count` if the whole area runs out.
+    """
+    claimed = []
+    for pin in geo.dispatch_area(pin_code):
+        if len(claimed) == count:
+            break
+        claimed.extend(_claim_many_in_pin(db, pin, count - len(claimed)))
+    return claimed
+
+
+def _claim_many_in_pin(db: Session, pin_code: str, count: int) -> list[PartnerRef]:
+    claimed, tried = [], set()
+    while len(claimed) < count:
+        queued = [ref for ref in pool.snapshot(pin_code) if ref.id not in tried]
+        if queued:
+            loads = _delivery_counts(db, [ref.id for ref in queued])
+            # sorted() is stable, so equal loads keep their queue (idle) order
+            ranked = sorted(queued, key=lambda ref: loads.get(ref.id, 0))
+            wanted = [ref.id for ref in ranked[:count - len(claimed)]]
+            candidates = pool.take(pin_code, wanted)
+        else:
+            rows = db.execute(
+                select(models.DeliveryPartner.id, models.DeliveryPartner.user_id, models.DeliveryPartner.pin_code)
+                .where(
+                    models.DeliveryPartner.pin_code == pin_code,
+                    models.DeliveryPartner.availability == True,
+                    models.DeliveryPartner.id.not_in(tried),
+                )
+                .order_by(models.DeliveryPartner.id)
+                .limit(count - len(claimed))
+            ).all()
+            candidates = [PartnerRef(*row) for row in rows]
+        if not candidates:
+            break
+        tried.update(ref.id for ref in candidates)
+        busy = set(db.scalars(
+            update(models.DeliveryPartner)
+            .where(
+                models.DeliveryPartner.id.in_([ref.id for ref in candidates]),
+                models.DeliveryPartner.availability == True,
+            )
+            .values(availability=False)
+            .returning(models.DeliveryPartner.id)
+        ))
+        won = [ref for ref in candidates if ref.id in busy]
+        if queued:
+            db.info.setdefault(CLAIMED_KEY, []).extend(won)
+        claimed.extend(won)
+    return claimed
+
+
+def _delivery_counts(db: Session, partner_ids: list[int]) -> dict[int, int]:
+    """Orders assigned to each partner within the balance window."""
+    since = datetime.utcnow() - timedelta(hours=DISPATCH_BALANCE_WINDOW_HOURS)
+    return dict(db.execute(
+        select(models.Order.delivery_partner_id, func.count())
+        .where(models.Order.delivery_partner_id.in_(partner_ids), models.Order.created_at >= since)
+        .group_by(models.Order.delivery_partner_id)
+    ).all())
+
+
+def release_partner(db: Session, partner_id: int):
+    """Mark a busy partner available; they join the back of their queue on commit."""
+    freed = db.execute(
+        update(models.DeliveryPartner)
+        .where(models.DeliveryPartner.id == partner_id, models.DeliveryPartner.availability == False)
+        .values(availability=True)
+        .returning(models.DeliveryPartner.id, models.DeliveryPartner.user_id, models.DeliveryPartner.pin_code)
+    ).first()
+    if freed:
+        db.info.setdefault(PENDING_KEY, []).append((True, PartnerRef(*freed)))
+
+
+def withdraw_partner(db: Session, partner: models.DeliveryPartner):
+    """Take a partner offline; they leave their queue on commit."""
+    partner.availability = False
+    db.info.setdefault(PENDING_KEY, []).append(
+        (False, PartnerRef(partner.id, partner.user_id, partner.pin_code))
+    )
+
+
+def enlist_partner(db: Session, partner: models.DeliveryPartner):
+    """Queue an already-available partner (e.g. just registered) on commit."""
+    db.info.setdefault(PENDING_KEY, []).append(
+        (True, PartnerRef(partner.id, partner.user_id, partner.pin_code))
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session):
+    session.info.pop(CLAIMED_KEY, None)
+    for available, ref in session.info.pop(PENDING_KEY, ()):
+        if available:
+            pool.push(ref)
+        else:
+            pool.remove(ref.id, ref.pin_code)
+
+
+@event.listens_for(Session, "after_rollback")
+def _return_claimed(session: Session):
+    session.info.pop(PENDING_KEY, None)
+    for ref in reversed(session.info.pop(CLAIMED_KEY, [])):
+        pool.push(ref, front=True)
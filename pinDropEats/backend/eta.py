@@ -0,0 +1,190 @@
+"""
+Delivery ETA model.
+
+An estimate is built from three parts:
+- preparation time (placed → out for delivery) of the restaurant's recent orders,
+- delivery time (out for delivery → delivered) in the restaurant's pin code,
+- the orders already in that restaurant's kitchen, plus a fixed wait when no
+  partner nearby is free.
+
+Each restaurant and pin code keeps its last ETA_HISTORY_SIZE durations. The
+estimate is a recency-weighted mean with outliers clipped to the 10th–90th
+percentile, computed with NumPy when a sample arrives, not at checkout.
+Checkout only reads cached numbers.
+
+Samples come from `orders.set_status` and are applied after the transition
+commits. `rebuild` reloads everything from the order timestamps. It runs at
+startup and every ETA_REBUILD_INTERVAL_SECONDS, so workers converge on
+transitions handled by other processes. Its queries read only the (covering
+or partial) ETA indexes on `orders` and are checked by `migrate.py --check`.
+"""
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import dispatch
+import geo
+import models
+
+ETA_HISTORY_SIZE = int(os.getenv("ETA_HISTORY_SIZE", "50"))
+ETA_HISTORY_DAYS = float(os.getenv("ETA_HISTORY_DAYS", "14"))
+ETA_DECAY = float(os.getenv("ETA_DECAY", "0.95"))
+ETA_DEFAULT_PREP_MINUTES = float(os.getenv("ETA_DEFAULT_PREP_MINUTES", "20"))
+ETA_DEFAULT_DELIVERY_MINUTES = float(os.getenv("ETA_DEFAULT_DELIVERY_MINUTES", "12"))
+ETA_KITCHEN_PARALLELISM = float(os.getenv("ETA_KITCHEN_PARALLELISM", "3"))
+ETA_PARTNER_WAIT_MINUTES = float(os.getenv("ETA_PARTNER_WAIT_MINUTES", "10"))
+ETA_MIN_MINUTES = int(os.getenv("ETA_MIN_MINUTES", "15"))
+ETA_REBUILD_INTERVAL_SECONDS = float(os.getenv("ETA_REBUILD_INTERVAL_SECONDS", "300"))
+
+KITCHEN_STATUSES = models.KITCHEN_STATUSES
+PENDING_KEY = "eta_pending"
+
+
+def _minutes(start, end) -> np.ndarray:
+    # Subtracting the datetimes directly is far faster than converting
+    # tens of thousands of them to datetime64 first
+    return np.array([(e - s).total_seconds() for s, e in zip(start, end)]) / 60
+
+
+class RollingEstimate:
+    """Last `size` durations per key and a cached estimate for each key."""
+
+    def __init__(self, default: float, size: int = ETA_HISTORY_SIZE, decay: float = ETA_DECAY):
+        self.default = default
+        self.size = size
+        self.decay = decay
+        self._samples: dict = {}
+        self._estimates: dict = {}
+
+    def get(self, key) -> float:
+        return self._estimates.get(key, self.default)
+
+    def add(self, key, minutes: float):
+        samples = np.append(self._samples.get(key, np.empty(0)), minutes)[-self.size:]
+        self._samples[key] = samples
+        self._estimates[key] = self._estimate(samples)
+
+    def load(self, keys, minutes):
+        """Replace all history; samples must be ordered oldest first."""
+        keys = np.asarray(keys)
+        minutes = np.asarray(minutes, dtype=float)
+        self._samples, self._estimates = {}, {}
+        if not len(keys):
+            return
+        # Stable sort groups samples by key while keeping them in time order
+        order = np.argsort(keys, kind="stable")
+        keys, minutes = keys[order], minutes[order]
+        unique, starts = np.unique(keys, return_index=True)
+        for key, samples in zip(unique.tolist(), np.split(minutes, starts[1:])):
+            samples = samples[-self.size:]
+            self._samples[key] = samples
+            self._estimates[key] = self._estimate(samples)
+
+    def _estimate(self, samples: np.ndarray) -> float:
+        samples = samples[samples >= 0]
+        if not len(samples):
+            return self.default
+        lo, hi = np.percentile(samples, [10, 90])
+        weights = self.decay ** np.arange(len(samples) - 1, -1, -1)
+        return float(np.average(np.clip(samples, lo, hi), weights=weights))
+
+
+class EtaModel:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prep = RollingEstimate(ETA_DEFAULT_PREP_MINUTES)          # by restaurant id
+        self.delivery = RollingEstimate(ETA_DEFAULT_DELIVERY_MINUTES)  # by pin code
+        self.kitchen = Counter()                                       # orders not yet dispatched
+
+    def estimate(self, restaurant_id: int, pin_code: str) -> int:
+        """Minutes from now until an order placed now is delivered."""
+        with self._lock:
+            prep = self.prep.get(restaurant_id)
+            delivery = self.delivery.get(pin_code)
+            ahead = self.kitchen[restaurant_id]
+        minutes = prep + prep * ahead / ETA_KITCHEN_PARALLELISM + delivery
+        if not any(dispatch.pool.available(pin) for pin in geo.dispatch_area(pin_code)):
+            minutes += ETA_PARTNER_WAIT_MINUTES
+        return max(round(minutes), ETA_MIN_MINUTES)
+
+    def rebuild(self, db: Session):
+        since = datetime.utcnow() - timedelta(days=ETA_HISTORY_DAYS)
+        o, r = models.Order, models.Restaurant
+        # Core rows: tens of thousands of them, and no ORM entities involved
+        conn = db.connection()
+        dispatched = conn.execute(
+            select(o.restaurant_id, o.created_at, o.dispatched_at)
+            .where(o.dispatched_at >= since)
+            .order_by(o.dispatched_at)
+        ).all()
+        delivered = conn.execute(
+            select(r.pin_code, o.dispatched_at, o.delivered_at)
+            .join(r, o.restaurant_id == r.id)
+            .where(o.delivered_at >= since, o.dispatched_at.is_not(None))
+            .order_by(o.delivered_at)
+        ).all()
+        kitchen = Counter(dict(conn.execute(
+            select(o.restaurant_id, func.count())
+            .where(text(models.IN_KITCHEN_SQL))
+            .group_by(o.restaurant_id)
+        ).all()))
+
+        prep = RollingEstimate(ETA_DEFAULT_PREP_MINUTES)
+        delivery = RollingEstimate(ETA_DEFAULT_DELIVERY_MINUTES)
+        if dispatched:
+            rid, created, out = zip(*dispatched)
+            prep.load(rid, _minutes(created, out))
+        if delivered:
+            pin, out, done = zip(*delivered)
+            delivery.load(pin, _minutes(out, done))
+        with self._lock:
+            self.prep, self.delivery, self.kitchen = prep, delivery, kitchen
+
+    def apply(self, changes):
+        with self._lock:
+            for kind, key, value in changes:
+                if kind == "kitchen":
+                    self.kitchen[key] = max(self.kitchen[key] + value, 0)
+                elif kind == "prep":
+                    self.prep.add(key, value)
+                else:
+                    self.delivery.add(key, value)
+
+
+model = EtaModel()
+
+
+def rebuild_model():
+    db = SessionLocal()
+    try:
+        model.rebuild(db)
+    finally:
+        db.close()
+
+
+def observe(db: Session, order: models.Order, previous: str, status: str, at: datetime):
+    """Record what a status change means for the model; applied when `db` commits."""
+    changes = db.info.setdefault(PENDING_KEY, [])
+    was_cooking, cooking = previous in KITCHEN_STATUSES, status in KITCHEN_STATUSES
+    if cooking != was_cooking:
+        changes.append(("kitchen", order.restaurant_id, 1 if cooking else -1))
+    if status == "Out for Delivery" and order.created_at:
+        changes.append(("prep", order.restaurant_id, (at - order.created_at).total_seconds() / 60))
+    elif status == "Delivered" and order.dispatched_at:
+        changes.append(("delivery", order.restaurant.pin_code, (at - order.dispatched_at).total_seconds() / 60))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session):
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        model.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
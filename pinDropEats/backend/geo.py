@@ -0,0 +1,116 @@
+"""
+Pin-code adjacency index.
+
+Pin-code centroids are read once from a CSV (pin_code,latitude,longitude) and
+each pin code's nearest neighbours within `GEO_INDEX_RADIUS_KM` are computed up
+front, using a lat/lon grid so only nearby cells are compared. Requests then
+only read precomputed, distance-sorted lists.
+
+Used for:
+- dispatch: when a pin code has no free partner, the nearest pin codes within
+  DISPATCH_FALLBACK_RADIUS_KM are tried (closest first).
+- browsing: with BROWSE_RADIUS_KM > 0 customers also see restaurants in pin
+  codes within that radius. The default of 0 keeps exact pin-code matching.
+
+Pin codes missing from the CSV simply have no neighbours.
+"""
+import csv
+import math
+import os
+from collections import defaultdict
+
+PIN_CENTROIDS_CSV = os.getenv(
+    "PIN_CENTROIDS_CSV",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pin_centroids.csv"),
+)
+DISPATCH_FALLBACK_RADIUS_KM = float(os.getenv("DISPATCH_FALLBACK_RADIUS_KM", "5"))
+DISPATCH_FALLBACK_PINS = int(os.getenv("DISPATCH_FALLBACK_PINS", "3"))
+BROWSE_RADIUS_KM = float(os.getenv("BROWSE_RADIUS_KM", "0"))
+GEO_MAX_NEIGHBOURS = int(os.getenv("GEO_MAX_NEIGHBOURS", "16"))
+GEO_INDEX_RADIUS_KM = max(DISPATCH_FALLBACK_RADIUS_KM, BROWSE_RADIUS_KM)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def load_centroids(path: str = PIN_CENTROIDS_CSV) -> dict[str, tuple[float, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        return {
+            row["pin_code"].strip(): (float(row["latitude"]), float(row["longitude"]))
+            for row in csv.DictReader(f)
+        }
+
+
+class PinIndex:
+    def __init__(
+        self,
+        centroids: dict[str, tuple[float, float]],
+        radius_km: float = GEO_INDEX_RADIUS_KM,
+        max_neighbours: int = GEO_MAX_NEIGHBOURS,
+    ):
+        self._neighbours: dict[str, list[tuple[str, float]]] = {}
+        self._near_to: dict[str, set[str]] = defaultdict(set)
+        if radius_km <= 0 or not centroids:
+            return
+
+        # Cells are radius_km tall, so every neighbour is within one cell in
+        # latitude; longitude cells shrink with cos(lat) and need a wider span.
+        cell = radius_km / KM_PER_DEGREE_LAT
+        grid = defaultdict(list)
+        for pin, (lat, lon) in centroids.items():
+            grid[(math.floor(lat / cell), math.floor(lon / cell))].append(pin)
+
+        for pin, point in centroids.items():
+            row, col = math.floor(point[0] / cell), math.floor(point[1] / cell)
+            span = math.ceil(1 / max(math.cos(math.radians(point[0])), 0.01))
+            found = []
+            for r in range(row - 1, row + 2):
+                for c in range(col - span, col + span + 1):
+                    for other in grid.get((r, c), ()):
+                        if other != pin:
+                            km = haversine_km(point, centroids[other])
+                            if km <= radius_km:
+                                found.append((km, other))
+            found.sort()
+            self._neighbours[pin] = [(other, km) for km, other in found[:max_neighbours]]
+            for other, _ in self._neighbours[pin]:
+                self._near_to[other].add(pin)
+
+    def nearby(self, pin_code: str, radius_km: float, limit: int = None) -> list[str]:
+        """Pin codes within `radius_km` of `pin_code`, closest first (excluding itself)."""
+        pins = [p for p, km in self._neighbours.get(pin_code, ()) if km <= radius_km]
+        return pins[:limit] if limit is not None else pins
+
+    def near_to(self, pin_code: str) -> set[str]:
+        """Pin codes that have `pin_code` among their neighbours."""
+        return self._near_to.get(pin_code, set())
+
+
+index = PinIndex(load_centroids())
+
+
+def dispatch_area(pin_code: str) -> list[str]:
+    """Pin codes to search for a free partner, in order."""
+    return [pin_code] + index.nearby(pin_code, DISPATCH_FALLBACK_RADIUS_KM, DISPATCH_FALLBACK_PINS)
+
+
+def browse_area(pin_code: str) -> list[str]:
+    """Pin codes whose restaurants a customer in `pin_code` may order from."""
+    if BROWSE_RADIUS_KM <= 0:
+        return [pin_code]
+    return [pin_code] + index.nearby(pin_code, BROWSE_RADIUS_KM)
+
+
+def browsed_from(pin_code: str) -> list[str]:
+    """Pin codes whose browse area includes `pin_code`."""
+    if BROWSE_RADIUS_KM <= 0:
+        return [pin_code]
+    return [pin_code, *index.near_to(pin_code)]
@@ -2,19 +2,49 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import engine, get_db, Base
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from database import AsyncSessionLocal, SessionLocal, engine, async_engine, get_db, get_async_db
+from auth import (
+    hash_password, verify_password, create_access_token, get_current_user,
+    create_stream_ticket, authenticate_stream_ticket, STREAM_TICKET_EXPIRE_SECONDS, CurrentUser,
+)
+from notifications import hub, unread
+from dispatch import enlist_partner, rebuild_pool
+from pagination import PageParams, paginate_async
 import models
 import schemas
+import eta
+import metrics
+import migrate
+import retention
+import stats
 
 from routers import admin, restaurant_owner, customer, delivery, customer_care
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Create missing tables and indexes (idempotent)
+migrate.upgrade()
+
+logger = logging.getLogger("pindropeats")
+
+STREAM_KEEPALIVE_SECONDS = 20
+STREAM_RETRY_MS = 5000
+
+# Warn when one request runs the same SQL statement more than this many times
+# (the usual sign of an N+1 query); 0 turns the check off.
+SQL_REPEAT_WARNING_THRESHOLD = int(os.getenv("SQL_REPEAT_WARNING_THRESHOLD", "10"))
 
 app = FastAPI(
     title="PinDrop Eats",
@@ -31,6 +61,97 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# ── SQL instrumentation ──────────────────────────────
+
+class RequestSQL:
+    """Statements run and time spent in the database during one request."""
+
+    __slots__ = ("statements", "seconds", "shapes", "started")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.started = 0.0
+
+
+_request_sql: ContextVar[Optional[RequestSQL]] = ContextVar("request_sql", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql.started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql.seconds += time.perf_counter() - sql.started
+        sql.statements += 1
+        if SQL_REPEAT_WARNING_THRESHOLD > 0:
+            # Parameters are bound separately, so the text is the statement's shape
+            sql.shapes[statement] += 1
+
+
+for _target in (engine, async_engine.sync_engine):
+    event.listen(_target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_target, "after_cursor_execute", _after_cursor_execute)
+
+
+class SQLTimingMiddleware:
+    """
+    Adds a Server-Timing header with the request's statement count and DB time,
+    and logs statements repeated more than SQL_REPEAT_WARNING_THRESHOLD times.
+
+    Everything is measured up to the start of the response, so rows a
+    StreamingResponse pulls afterwards (exports, SSE) are not included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sql = RequestSQL()
+        token = _request_sql.set(sql)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={sql.seconds * 1000:.2f};desc="{sql.statements} statements", '
+                    f"app;dur={total_ms:.2f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+                _warn_repeated_statements(scope, sql)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_sql.reset(token)
+
+
+def _warn_repeated_statements(scope, sql: RequestSQL):
+    if SQL_REPEAT_WARNING_THRESHOLD <= 0:
+        return
+    for statement, count in sql.shapes.items():
+        if count > SQL_REPEAT_WARNING_THRESHOLD:
+            logger.warning(
+                "%s %s ran the same statement %d times (possible N+1): %s",
+                scope["method"], scope["path"], count, " ".join(statement.split())[:300],
+            )
+
+
+app.add_middleware(SQLTimingMiddleware)
+# Outermost, so its latency covers the other middleware too
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(admin.router)
 app.include_router(restaurant_owner.router)
@@ -38,6 +159,46 @@ app.include_router(customer.router)
 app.include_router(delivery.router)
 app.include_router(customer_care.router)
 
+@app.on_event("startup")
+def load_dispatch_pool():
+    rebuild_pool()
+
+
+@app.on_event("startup")
+def load_eta_model():
+    eta.rebuild_model()
+
+
+@app.on_event("startup")
+def load_platform_stats():
+    db = SessionLocal()
+    try:
+        stats.ensure_stats(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    jobs = [
+        ("Notification retention", retention.compact_notifications, retention.NOTIFICATION_RETENTION_INTERVAL_SECONDS),
+        ("ETA model rebuild", eta.rebuild_model, eta.ETA_REBUILD_INTERVAL_SECONDS),
+    ]
+    for name, job, interval in jobs:
+        if interval > 0:
+            asyncio.create_task(_run_periodically(name, job, interval))
+
+
+async def _run_periodically(name: str, job, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Jobs use the sync engine, so they run in a worker thread
+            await asyncio.to_thread(job)
+        except Exception:
+            logger.exception("%s failed", name)
+
+
 # Serve frontend static files
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
 if os.path.exists(FRONTEND_DIR):
@@ -70,6 +231,8 @@ def register(data: schemas.UserCreate, db: Session = Depends(get_db)):
             pin_code=data.pin_code,
         )
         db.add(dp)
+        db.flush()
+        enlist_partner(db, dp)
         db.commit()
 
     token = create_access_token({"user_id": user.id, "role": user.role})
@@ -93,38 +256,103 @@ def login(data: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/api/auth/me", response_model=schemas.UserResponse)
-def get_me(user: models.User = Depends(get_current_user)):
+def get_me(user: CurrentUser = Depends(get_current_user)):
     return schemas.UserResponse.model_validate(user)
 
 
 # ── Notifications (shared across roles) ──────────────
-@app.get("/api/notifications", response_model=list[schemas.NotificationResponse])
-def get_notifications(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+@app.get("/api/notifications", response_model=schemas.NotificationPage)
+async def get_notifications(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    notifs, next_cursor = await paginate_async(
+        db, select(models.Notification).where(models.Notification.user_id == user.id),
+        models.Notification, page,
+    )
+    return schemas.NotificationPage(items=notifs, next_cursor=next_cursor)
+
+
+@app.get("/api/notifications/unread-count", response_model=schemas.UnreadCount)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    return (
-        db.query(models.Notification)
-        .filter(models.Notification.user_id == user.id)
-        .order_by(models.Notification.created_at.desc())
-        .limit(20)
-        .all()
+    """Served from the in-memory counter; the table is only counted on a miss."""
+    count, generation = unread.lookup(user.id)
+    if count is None:
+        count = await db.scalar(
+            select(func.count()).select_from(models.Notification).where(
+                models.Notification.user_id == user.id,
+                models.Notification.is_read == False,
+            )
+        )
+        unread.store(user.id, generation, count)
+    return schemas.UnreadCount(unread=count)
+
+
+@app.post("/api/notifications/stream-ticket", response_model=schemas.StreamTicket)
+def create_notification_stream_ticket(user: CurrentUser = Depends(get_current_user)):
+    """A short-lived ticket that opens the notification stream and nothing else."""
+    return schemas.StreamTicket(ticket=create_stream_ticket(user.id), expires_in=STREAM_TICKET_EXPIRE_SECONDS)
+
+
+@app.get("/api/notifications/stream")
+async def stream_notifications(request: Request, ticket: str):
+    """Server-Sent Events stream of new notifications.
+
+    EventSource cannot send an Authorization header, so the stream is opened
+    with a ticket from /api/notifications/stream-ticket in the query string.
+    The access token never goes into a URL. The ticket is only checked on
+    connect, so an open stream outlives it; a reconnect needs a new one.
+    Idle streams cost no queries: events come from the in-process hub as
+    notifications are committed.
+    """
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_stream_ticket(ticket, db)
+
+    async def events():
+        queue = hub.subscribe(user.id)
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: notification\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            hub.unsubscribe(user.id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @app.put("/api/notifications/read")
 def mark_notifications_read(
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     db.query(models.Notification).filter(
         models.Notification.user_id == user.id,
         models.Notification.is_read == False,
     ).update({"is_read": True})
     db.commit()
+    unread.invalidate(user.id)
     return {"message": "All notifications marked as read"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """This worker's counters in the Prometheus text format (unauthenticated: keep it off the public network)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root():
     return {"message": "PinDrop Eats API is running!", "docs": "/docs"}
@@ -0,0 +1,239 @@
+"""
+In-process metrics, served at /metrics in the Prometheus text format.
+
+Modules declare the metrics they own (`counter`, `gauge`, `histogram`,
+`gauge_callback`) and update them in place; `render` walks every registered
+family when scraped.
+
+Updates never take a lock. Counters are `itertools.count` objects, whose
+`next()` is a single C call under the GIL, so request threads can increment
+them concurrently. Histogram sums are kept per thread and added up at scrape
+time. Only reading a counter takes a lock, and scrapes are rare.
+
+Values are per process: behind a load balancer with several workers, scrape
+each worker (or each instance) directly rather than through the balancer.
+"""
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+
+class Counter:
+    __slots__ = ("_count", "_reads", "_lock", "inc")
+
+    def __init__(self):
+        self._count = itertools.count()
+        self._reads = 0
+        self._lock = threading.Lock()
+        # The C-level __next__ itself, saving a Python call per increment
+        self.inc = self._count.__next__
+
+    @property
+    def value(self) -> int:
+        # Reading consumes one step of the count, so reads are subtracted
+        with self._lock:
+            value = next(self._count) - self._reads
+            self._reads += 1
+        return value
+
+    def samples(self, name: str, labels: dict):
+        yield name, labels, self.value
+
+
+class Gauge:
+    __slots__ = ("_up", "_down", "inc", "dec")
+
+    def __init__(self):
+        self._up = Counter()
+        self._down = Counter()
+        self.inc = self._up.inc
+        self.dec = self._down.inc
+
+    @property
+    def value(self) -> int:
+        # Decrements first: every one of them follows an increment, so this never goes negative
+        down = self._down.value
+        return self._up.value - down
+
+    def samples(self, name: str, labels: dict):
+        yield name, labels, self.value
+
+
+class _ThreadSum:
+    """A float total kept in one cell per thread, so adding needs no lock."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._cells = []
+
+    def add(self, amount: float):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._local.cell = [0.0]
+            self._cells.append(cell)
+        cell[0] += amount
+
+    @property
+    def value(self) -> float:
+        return sum(cell[0] for cell in list(self._cells))
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self._bounds = buckets
+        self._buckets = [Counter() for _ in range(len(buckets) + 1)]  # last one is +Inf
+        self._sum = _ThreadSum()
+
+    def observe(self, value: float):
+        self._buckets[bisect_left(self._bounds, value)].inc()
+        self._sum.add(value)
+
+    def samples(self, name: str, labels: dict):
+        total = 0
+        for bound, bucket in zip((*self._bounds, "+Inf"), self._buckets):
+            total += bucket.value
+            yield f"{name}_bucket", {**labels, "le": str(bound)}, total
+        yield f"{name}_sum", labels, self._sum.value
+        yield f"{name}_count", labels, total
+
+
+class Family:
+    """One metric name; a child per combination of label values."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple, factory: Callable):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self._factory = factory
+        self._children = {}
+        _registry.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def samples(self):
+        for values, child in sorted(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+
+class CallbackFamily(Family):
+    """A gauge read at scrape time: `fn` returns {label values: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, fn: Callable[[], dict]):
+        super().__init__(name, help, "gauge", labelnames, factory=None)
+        self._fn = fn
+
+    def samples(self):
+        for values, value in sorted(self._fn().items()):
+            yield self.name, dict(zip(self.labelnames, values)), value
+
+
+def _declare(name: str, help: str, kind: str, labelnames: tuple, factory: Callable):
+    family = Family(name, help, kind, labelnames, factory)
+    return family if labelnames else family.labels()
+
+
+def counter(name: str, help: str, labelnames: tuple = ()):
+    return _declare(name, help, "counter", labelnames, Counter)
+
+
+def gauge(name: str, help: str, labelnames: tuple = ()):
+    return _declare(name, help, "gauge", labelnames, Gauge)
+
+
+def histogram(name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+    return _declare(name, help, "histogram", labelnames, lambda: Histogram(buckets))
+
+
+def gauge_callback(name: str, help: str, labelnames: tuple, fn: Callable[[], dict]) -> CallbackFamily:
+    return CallbackFamily(name, help, labelnames, fn)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    lines = []
+    for family in _registry:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for name, labels, value in family.samples():
+            if labels:
+                pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                name = f"{name}{{{pairs}}}"
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ── HTTP ─────────────────────────────────────────────
+
+HTTP_REQUESTS = counter(
+    "pindrop_http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"),
+)
+HTTP_DURATION = histogram(
+    "pindrop_http_request_duration_seconds",
+    "Time to serve a request, body included; streamed responses up to their first byte", ("method", "route"),
+)
+HTTP_IN_FLIGHT = gauge("pindrop_http_requests_in_flight", "Requests being served right now")
+
+UNMATCHED_ROUTE = "[unmatched]"
+
+
+class MetricsMiddleware:
+    """
+    Counts and times every HTTP request by route template (e.g.
+    /api/owner/orders/{order_id}), so ids in the path do not become labels.
+    Requests that match no route (static files, 404s) share one label.
+
+    A response started without a Content-Length is streamed (SSE, exports)
+    and may stay open for hours, so it is finished when it starts, like in
+    SQLTimingMiddleware: in-flight then counts requests being worked on, not
+    connected browsers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            HTTP_IN_FLIGHT.dec()
+            path = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            HTTP_DURATION.labels(method, path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, path, str(status)).inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if not any(name.lower() == b"content-length" for name, _ in message.get("headers", ())):
+                    finish()
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finish()
@@ -0,0 +1,122 @@
+"""
+Schema migration: brings an existing database up to date with models.py.
+Run: python migrate.py            # apply
+     python migrate.py --check    # apply, then verify hot queries use an index
+
+`Base.metadata.create_all` only creates missing tables, so columns and indexes
+added to tables that already exist never reach older pindropeats.db files.
+`upgrade` adds whatever is missing and is safe to run on every startup. New
+columns must be nullable (or have a server default) to be added this way.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, inspect, select, text
+from database import engine, Base
+import models
+
+
+def upgrade(bind=engine) -> list[str]:
+    """Create missing tables, columns and indexes. Returns what was added."""
+    Base.metadata.create_all(bind=bind)
+    created = []
+    with bind.begin() as conn:
+        insp = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            columns = {col["name"] for col in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    col_type = column.type.compile(dialect=conn.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}')
+                    created.append(f"{table.name}.{column.name}")
+            existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+    return created
+
+
+# Representative versions of the per-request router queries.
+HOT_QUERIES = {
+    "customer orders": select(models.Order)
+        .where(models.Order.customer_id == 1)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc()).limit(51),
+    "restaurant orders": select(models.Order)
+        .where(models.Order.restaurant_id == 1)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc()).limit(51),
+    "partner orders": select(models.Order)
+        .where(models.Order.delivery_partner_id == 1)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc()).limit(51),
+    "all orders": select(models.Order)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc()).limit(51),
+    "order items": select(models.OrderItem).where(models.OrderItem.order_id.in_([1, 2, 3])),
+    "order history": select(models.OrderEvent)
+        .where(models.OrderEvent.order_id == 1).order_by(models.OrderEvent.ts),
+    "restaurant events": select(models.OrderEvent)
+        .where(models.OrderEvent.restaurant_id == 1, models.OrderEvent.ts >= "2024-01-01"),
+    "cart": select(models.Cart).where(models.Cart.customer_id == 1),
+    "notifications": select(models.Notification)
+        .where(models.Notification.user_id == 1)
+        .order_by(models.Notification.created_at.desc(), models.Notification.id.desc()).limit(21),
+    "unread notifications": select(models.Notification)
+        .where(models.Notification.user_id == 1, models.Notification.is_read == False),
+    "browse restaurants": select(models.Restaurant)
+        .where(models.Restaurant.pin_code == "110001", models.Restaurant.status == "active"),
+    "owner restaurant": select(models.Restaurant).where(models.Restaurant.owner_id == 1),
+    "menu": select(models.Dish).where(models.Dish.restaurant_id == 1),
+    "available partners": select(models.DeliveryPartner)
+        .where(models.DeliveryPartner.availability == True, models.DeliveryPartner.pin_code == "110001"),
+    "customer complaints": select(models.Complaint)
+        .where(models.Complaint.customer_id == 1)
+        .order_by(models.Complaint.created_at.desc(), models.Complaint.id.desc()).limit(51),
+    "analytics": select(models.OrderRollup)
+        .where(models.OrderRollup.granularity == "day", models.OrderRollup.bucket >= "2024-01-01"),
+    "restaurant analytics": select(models.OrderRollup)
+        .where(models.OrderRollup.granularity == "day", models.OrderRollup.restaurant_id == 1,
+               models.OrderRollup.bucket >= "2024-01-01"),
+    "pin code analytics": select(models.OrderRollup)
+        .where(models.OrderRollup.granularity == "day", models.OrderRollup.pin_code == "110001",
+               models.OrderRollup.bucket >= "2024-01-01"),
+    "all complaints": select(models.Complaint)
+        .order_by(models.Complaint.created_at.desc(), models.Complaint.id.desc()).limit(51),
+    # dispatch._delivery_counts, on every batch dispatch
+    "dispatch balance": select(models.Order.delivery_partner_id, func.count())
+        .where(models.Order.delivery_partner_id.in_([1, 2, 3]), models.Order.created_at >= "2024-01-01")
+        .group_by(models.Order.delivery_partner_id),
+    # eta.EtaModel.rebuild, at startup and every ETA_REBUILD_INTERVAL_SECONDS
+    "eta prep samples": select(models.Order.restaurant_id, models.Order.created_at, models.Order.dispatched_at)
+        .where(models.Order.dispatched_at >= "2024-01-01").order_by(models.Order.dispatched_at),
+    "eta delivery samples": select(models.Restaurant.pin_code, models.Order.dispatched_at, models.Order.delivered_at)
+        .join(models.Restaurant, models.Order.restaurant_id == models.Restaurant.id)
+        .where(models.Order.delivered_at >= "2024-01-01", models.Order.dispatched_at.is_not(None))
+        .order_by(models.Order.delivered_at),
+    "eta kitchen queue": select(models.Order.restaurant_id, func.count())
+        .where(text(models.IN_KITCHEN_SQL))
+        .group_by(models.Order.restaurant_id),
+}
+
+
+def check_query_plans(bind=engine) -> dict[str, list[str]]:
+    """EXPLAIN each hot query; return the ones that scan a table without an index."""
+    failures = {}
+    with bind.connect() as conn:
+        for name, stmt in HOT_QUERIES.items():
+            sql = str(stmt.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            if any(step.startswith("SCAN") and "INDEX" not in step for step in plan):
+                failures[name] = plan
+    return failures
+
+
+if __name__ == "__main__":
+    created = upgrade()
+    print(f"✓ Added {len(created)} columns/indexes" + (f": {', '.join(created)}" if created else ""))
+    if "--check" in sys.argv:
+        failures = check_query_plans()
+        for name, plan in failures.items():
+            print(f"✗ {name}: {' / '.join(plan)}")
+        if failures:
+            sys.exit(1)
+        print(f"✓ All {len(HOT_QUERIES)} hot queries use an index")
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+    Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Index, text
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -37,6 +37,11 @@ class Restaurant(Base):
     offers = relationship("Offer", back_populates="restaurant")
     owner = relationship("User", foreign_keys=[owner_id])
 
+    __table_args__ = (
+        Index("ix_restaurants_pin_status", "pin_code", "status"),
+        Index("ix_restaurants_owner", "owner_id"),
+    )
+
 
 class Dish(Base):
     __tablename__ = "dishes"
@@ -50,6 +55,10 @@ class Dish(Base):
 
     restaurant = relationship("Restaurant", back_populates="dishes")
 
+    __table_args__ = (
+        Index("ix_dishes_restaurant", "restaurant_id"),
+    )
+
 
 class DeliveryPartner(Base):
     __tablename__ = "delivery_partners"
@@ -61,6 +70,17 @@ class DeliveryPartner(Base):
 
     user = relationship("User", foreign_keys=[user_id])
 
+    __table_args__ = (
+        Index("ix_delivery_partners_pin_avail", "pin_code", "availability"),
+    )
+
+
+# Orders a kitchen has yet to send out. The condition is spelled out with
+# literals because SQLite only uses a partial index when the query repeats its
+# WHERE clause, which an IN list of bound parameters never does.
+KITCHEN_STATUSES = ("Placed", "Accepted", "Preparing")
+IN_KITCHEN_SQL = "order_status IN ({})".format(", ".join(f"'{s}'" for s in KITCHEN_STATUSES))
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -77,6 +97,10 @@ class Order(Base):
     offer_id = Column(Integer, ForeignKey("offers.id"), nullable=True)
     estimated_delivery_time = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Transition times, set by orders.set_status
+    accepted_at = Column(DateTime, nullable=True)
+    dispatched_at = Column(DateTime, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
 
     customer = relationship("User", back_populates="orders", foreign_keys=[customer_id])
     restaurant = relationship("Restaurant", back_populates="orders")
@@ -84,6 +108,24 @@ class Order(Base):
     delivery_partner = relationship("DeliveryPartner", foreign_keys=[delivery_partner_id])
     complaints = relationship("Complaint", back_populates="order")
 
+    # Listings filter on one owner column and page on (created_at, id);
+    # SQLite appends the rowid to every index, so these cover the keyset.
+    __table_args__ = (
+        Index("ix_orders_customer_created", "customer_id", "created_at"),
+        Index("ix_orders_restaurant_created", "restaurant_id", "created_at"),
+        Index("ix_orders_partner_created", "delivery_partner_id", "created_at"),
+        Index("ix_orders_created", "created_at"),
+        # ETA model rebuild: recent transitions and the orders still in a
+        # kitchen. Covering, so the rebuild never reads the table itself.
+        Index("ix_orders_dispatched", "dispatched_at", "restaurant_id", "created_at"),
+        Index("ix_orders_delivered", "delivered_at", "dispatched_at", "restaurant_id"),
+        # Partial: only the few orders still in a kitchen
+        Index(
+            "ix_orders_in_kitchen", "restaurant_id",
+            sqlite_where=text(IN_KITCHEN_SQL), postgresql_where=text(IN_KITCHEN_SQL),
+        ),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -97,6 +139,28 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     dish = relationship("Dish")
 
+    __table_args__ = (
+        Index("ix_order_items_order", "order_id"),
+    )
+
+
+class OrderEvent(Base):
+    """Append-only log of order status changes, written by orders.set_status."""
+    __tablename__ = "order_events"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id"), nullable=False)
+    from_status = Column(String(30), nullable=True)  # None when the order is placed
+    to_status = Column(String(30), nullable=False)
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=True)
+    ts = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_order_events_order_ts", "order_id", "ts"),
+        Index("ix_order_events_restaurant_ts", "restaurant_id", "ts"),
+    )
+
 
 class Offer(Base):
     __tablename__ = "offers"
@@ -126,6 +190,11 @@ class Complaint(Base):
     order = relationship("Order", back_populates="complaints")
     customer = relationship("User", back_populates="complaints")
 
+    __table_args__ = (
+        Index("ix_complaints_customer_created", "customer_id", "created_at"),
+        Index("ix_complaints_created", "created_at"),
+    )
+
 
 class Cart(Base):
     __tablename__ = "cart"
@@ -140,6 +209,10 @@ class Cart(Base):
     dish = relationship("Dish")
     restaurant = relationship("Restaurant")
 
+    __table_args__ = (
+        Index("ix_cart_customer", "customer_id"),
+    )
+
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -151,3 +224,57 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        Index("ix_notifications_user_read_created", "user_id", "is_read", "created_at"),
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+    )
+
+
+class PlatformStat(Base):
+    """Materialized admin dashboard counters, maintained by stats.py."""
+    __tablename__ = "platform_stats"
+
+    key = Column(String(60), primary_key=True)
+    value = Column(Float, nullable=False, default=0)
+
+
+class OrderRollup(Base):
+    """Order totals per restaurant per hour/day bucket, maintained by analytics.py."""
+    __tablename__ = "order_rollups"
+
+    granularity = Column(String(4), primary_key=True)  # "hour" | "day"
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # bucket start, UTC
+    pin_code = Column(String(10), nullable=False)
+    # Counted when the order is placed
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    discount = Column(Float, nullable=False, default=0)
+    restaurant_fee = Column(Float, nullable=False, default=0)
+    # Counted when the order is delivered / cancelled or rejected
+    delivered = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(Float, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+    cancelled_revenue = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_order_rollups_bucket", "granularity", "bucket"),
+        Index("ix_order_rollups_pin_bucket", "granularity", "pin_code", "bucket"),
+    )
+
+
+class NotificationArchive(Base):
+    """Read notifications moved out of `notifications` by retention.py."""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True)  # id from `notifications`
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    message = Column(String(500), nullable=False)
+    is_read = Column(Boolean, default=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notifications_archive_user_created", "user_id", "created_at"),
+    )
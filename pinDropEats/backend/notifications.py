@@ -0,0 +1,159 @@
+"""
+Notification outbox and in-process push.
+
+`create_notification` only queues the message on the session. When that
+session commits, every queued notification is written with one INSERT inside
+the same transaction, so a status change that notifies several users costs one
+commit instead of one per message. A rollback discards the queue.
+
+After the commit succeeds the written rows are published to `hub`, which fans
+them out to the user's open notification streams, and added to `unread`, the
+per-user unread counters. Both are per process: with several workers a client
+only hears about commits made by the worker it is connected to and picks up the
+rest from `GET /api/notifications`; counters expire so they re-sync from the
+table periodically.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+import models
+import schemas
+
+OUTBOX_KEY = "notification_outbox"
+WRITTEN_KEY = "notifications_written"
+SUBSCRIBER_QUEUE_SIZE = 100
+UNREAD_COUNT_TTL_SECONDS = float(os.getenv("UNREAD_COUNT_TTL_SECONDS", "300"))
+
+
+def create_notification(db: Session, user_id: int, message: str):
+    """Queue a notification for a user; it is written when `db` commits."""
+    db.info.setdefault(OUTBOX_KEY, []).append({
+        "user_id": user_id,
+        "message": message,
+        "is_read": False,
+        "created_at": datetime.utcnow(),
+    })
+
+
+class NotificationHub:
+    """Per-user fan-out of new notifications to asyncio subscribers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Register a queue for `user_id`; call from the event loop."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs:
+                subs.difference_update({s for s in subs if s[1] is queue})
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id: int, payload: dict):
+        """Deliver to every subscriber of `user_id`; safe from any thread."""
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subs:
+            loop.call_soon_threadsafe(_offer, queue, payload)
+
+
+def _offer(queue: asyncio.Queue, payload: dict):
+    # A client that stopped reading loses pushes, not the notifications
+    # themselves; it catches up from the REST listing.
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        pass
+
+
+class UnreadCounter:
+    """Per-user unread counts, loaded from the table once and then maintained.
+
+    A count is only stored if no increment or invalidation happened while it was
+    being loaded, so a load racing with a commit cannot lose that commit.
+    """
+
+    def __init__(self, ttl: float = UNREAD_COUNT_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts: dict[int, tuple[float, int]] = {}
+        self._generations: dict[int, int] = defaultdict(int)
+
+    def lookup(self, user_id: int):
+        """Return `(count, generation)`; count is None if it must be loaded."""
+        with self._lock:
+            entry = self._counts.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                return entry[1], None
+            return None, self._generations[user_id]
+
+    def store(self, user_id: int, generation: int, count: int):
+        with self._lock:
+            if self._generations[user_id] == generation:
+                self._counts[user_id] = (time.monotonic() + self.ttl, count)
+
+    def add(self, user_id: int, n: int):
+        with self._lock:
+            self._generations[user_id] += 1
+            entry = self._counts.get(user_id)
+            if entry:
+                self._counts[user_id] = (entry[0], entry[1] + n)
+
+    def invalidate(self, user_id: int):
+        """Forget the count, so the next lookup reloads it from the table.
+
+        Used after bulk updates instead of storing the expected value: a
+        notification committed between the update and this call would be
+        overwritten by it.
+        """
+        with self._lock:
+            self._generations[user_id] += 1
+            self._counts.pop(user_id, None)
+
+
+hub = NotificationHub()
+unread = UnreadCounter()
+
+
+@event.listens_for(Session, "before_commit")
+def _write_outbox(session: Session):
+    rows = session.info.pop(OUTBOX_KEY, None)
+    if rows:
+        # Multi-row VALUES keeps this to one statement while returning ids
+        written = session.execute(
+            insert(models.Notification).values(rows).returning(
+                models.Notification.id,
+                models.Notification.user_id,
+                models.Notification.message,
+                models.Notification.is_read,
+                models.Notification.created_at,
+            )
+        ).all()
+        session.info.setdefault(WRITTEN_KEY, []).extend(written)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_written(session: Session):
+    for row in session.info.pop(WRITTEN_KEY, ()):
+        unread.add(row.user_id, 1)
+        payload = schemas.NotificationResponse.model_validate(row).model_dump(mode="json")
+        hub.publish(row.user_id, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_outbox(session: Session):
+    session.info.pop(OUTBOX_KEY, None)
+    session.info.pop(WRITTEN_KEY, None)
@@ -0,0 +1,138 @@
+"""
+Shared order loading + serialization.
+
+Every order listing needs the same object graph (items → dish, restaurant,
+customer, delivery partner → user). Loading it lazily costs several SELECTs
+per order, so listings go through `query_orders`, which eager-loads the whole
+graph in a constant number of queries, and `to_order_response`, which builds
+the response from what is already in memory.
+
+Status changes go through `set_status`, which also stamps the transition time
+columns, feeds the ETA model, the platform counters and the analytics rollups,
+and appends to `order_events`. Events are queued on
+the session and written with one INSERT just before it commits, once every new
+order has an id.
+"""
+from datetime import datetime
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+import analytics
+import eta
+import metrics
+import models
+import schemas
+import stats
+
+EVENTS_KEY = "order_events"
+PLACED_KEY = "orders_placed"
+
+ORDERS_PLACED = metrics.counter("pindrop_orders_placed_total", "Orders placed (committed checkouts)")
+
+STATUS_TIMESTAMPS = {
+    "Placed": "created_at",
+    "Accepted": "accepted_at",
+    "Out for Delivery": "dispatched_at",
+    "Delivered": "delivered_at",
+}
+
+# Many-to-one relations are joined into the main SELECT; the one-to-many
+# items collection is fetched with a single extra IN query.
+ORDER_LOAD_OPTIONS = (
+    joinedload(models.Order.restaurant),
+    joinedload(models.Order.customer),
+    joinedload(models.Order.delivery_partner).joinedload(models.DeliveryPartner.user),
+    selectinload(models.Order.items).joinedload(models.OrderItem.dish),
+)
+
+
+def query_orders(db: Session):
+    """Order query with the full response graph eager-loaded."""
+    return db.query(models.Order).options(*ORDER_LOAD_OPTIONS)
+
+
+def select_orders():
+    """`query_orders` as a `select()`, for AsyncSession handlers."""
+    return select(models.Order).options(*ORDER_LOAD_OPTIONS)
+
+
+def set_status(db: Session, order: models.Order, status: str):
+    """Move `order` to `status` as part of `db`'s transaction."""
+    at = datetime.utcnow()
+    previous = order.order_status
+    order.order_status = status
+    column = STATUS_TIMESTAMPS.get(status)
+    if column:
+        setattr(order, column, at)
+    eta.observe(db, order, previous, status, at)
+    stats.record_status_change(db, order, previous, status)
+    analytics.record_status_change(db, order, previous, status, at)
+    db.info.setdefault(EVENTS_KEY, []).append((order, previous, status, at))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_events(session: Session):
+    pending = session.info.pop(EVENTS_KEY, None)
+    if not pending:
+        return
+    session.flush()  # assigns ids to orders placed in this transaction
+    session.info[PLACED_KEY] = sum(1 for _, _, status, _ in pending if status == "Placed")
+    session.execute(insert(models.OrderEvent).values([
+        {
+            "order_id": order.id,
+            "restaurant_id": order.restaurant_id,
+            "from_status": previous,
+            "to_status": status,
+            "delivery_partner_id": order.delivery_partner_id,
+            "ts": at,
+        }
+        for order, previous, status, at in pending
+    ]))
+
+
+@event.listens_for(Session, "after_commit")
+def _count_placed(session: Session):
+    for _ in range(session.info.pop(PLACED_KEY, 0)):
+        ORDERS_PLACED.inc()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session: Session):
+    session.info.pop(EVENTS_KEY, None)
+    session.info.pop(PLACED_KEY, None)
+
+
+def to_order_response(o: models.Order) -> schemas.OrderResponse:
+    items = [
+        schemas.OrderItemResponse(
+            id=item.id,
+            dish_id=item.dish_id,
+            quantity=item.quantity,
+            price=item.price,
+            dish_name=item.dish.name if item.dish else None,
+        )
+        for item in o.items
+    ]
+    dp_name = None
+    if o.delivery_partner and o.delivery_partner.user:
+        dp_name = o.delivery_partner.user.name
+    return schemas.OrderResponse(
+        id=o.id,
+        customer_id=o.customer_id,
+        restaurant_id=o.restaurant_id,
+        total_amount=o.total_amount,
+        discount_amount=o.discount_amount,
+        restaurant_fee=o.restaurant_fee,
+        payment_mode=o.payment_mode,
+        order_status=o.order_status,
+        delivery_partner_id=o.delivery_partner_id,
+        estimated_delivery_time=o.estimated_delivery_time,
+        created_at=o.created_at,
+        items=items,
+        restaurant_name=o.restaurant.name if o.restaurant else None,
+        customer_name=o.customer.name if o.customer else None,
+        delivery_partner_name=dp_name,
+    )
+
+
+def to_order_responses(orders) -> list[schemas.OrderResponse]:
+    return [to_order_response(o) for o in orders]
@@ -0,0 +1,80 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+Listings are ordered newest first. A cursor encodes the (created_at, id) of the
+last row on a page; the next page filters strictly past it, so deep pages cost
+the same as the first one instead of growing like OFFSET scans.
+"""
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PageParams:
+    """Dependency collecting the `limit` / `after` query parameters."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    ):
+        self.limit = limit
+        self.after = after
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def apply_keyset(query, model, page: PageParams):
+    """Add keyset filter, ordering and limit to a Query or Select.
+
+    One extra row is fetched to tell whether another page exists.
+    """
+    if page.after:
+        ts, row_id = decode_cursor(page.after)
+        query = query.filter(
+            or_(
+                model.created_at < ts,
+                and_(model.created_at == ts, model.id < row_id),
+            )
+        )
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(page.limit + 1)
+
+
+def split_page(rows, page: PageParams):
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def paginate(query, model, page: PageParams):
+    """Fetch one page of `query`.
+
+    Returns `(rows, next_cursor)`; `next_cursor` is None on the last page.
+    """
+    return split_page(apply_keyset(query, model, page).all(), page)
+
+
+async def paginate_async(db: AsyncSession, stmt, model, page: PageParams):
+    """`paginate` for an ORM `select()` on an AsyncSession."""
+    result = await db.execute(apply_keyset(stmt, model, page))
+    return split_page(result.scalars().all(), page)
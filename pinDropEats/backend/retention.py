@@ -0,0 +1,86 @@
+"""
+Notification retention: moves old read notifications out of the hot table.
+Run: python retention.py                 # archive read notifications older than the retention age
+     python retention.py --days 7        # override the age
+     python retention.py --delete        # delete instead of archiving
+
+Listings only ever read a user's newest notifications, so read rows past the
+retention age are copied to `notifications_archive` (or dropped) and deleted
+from `notifications`. Work is done in batches of NOTIFICATION_RETENTION_BATCH
+rows, each in its own short transaction, so writers are never blocked for
+long. main.py also runs this periodically when
+NOTIFICATION_RETENTION_INTERVAL_SECONDS is set.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from database import engine
+import models
+
+NOTIFICATION_RETENTION_DAYS = float(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+NOTIFICATION_RETENTION_BATCH = int(os.getenv("NOTIFICATION_RETENTION_BATCH", "1000"))
+NOTIFICATION_RETENTION_ARCHIVE = os.getenv("NOTIFICATION_RETENTION_ARCHIVE", "true").lower() != "false"
+NOTIFICATION_RETENTION_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL_SECONDS", "0"))
+
+ARCHIVED_COLUMNS = ("id", "user_id", "message", "is_read", "created_at")
+
+
+def compact_notifications(
+    bind=engine,
+    older_than_days: float = NOTIFICATION_RETENTION_DAYS,
+    batch_size: int = NOTIFICATION_RETENTION_BATCH,
+    archive: bool = NOTIFICATION_RETENTION_ARCHIVE,
+) -> int:
+    """Archive (or delete) read notifications older than the cutoff.
+
+    Returns the number of rows removed from `notifications`.
+    """
+    n = models.Notification
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            # Walk the primary key so each batch resumes where the last one
+            # stopped instead of re-reading the unread rows it skipped.
+            ids = conn.scalars(
+                select(n.id)
+                .where(n.id > last_id, n.is_read == True, n.created_at < cutoff)
+                .order_by(n.id)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                return moved
+            if archive:
+                conn.execute(
+                    insert(models.NotificationArchive).from_select(
+                        ARCHIVED_COLUMNS,
+                        select(*(getattr(n, c) for c in ARCHIVED_COLUMNS)).where(n.id.in_(ids)),
+                    )
+                )
+            conn.execute(delete(n).where(n.id.in_(ids)))
+        moved += len(ids)
+        last_id = ids[-1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact read notifications")
+    parser.add_argument("--days", type=float, default=NOTIFICATION_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATION_RETENTION_BATCH)
+    parser.add_argument("--delete", action="store_true", help="delete instead of archiving")
+    args = parser.parse_args()
+
+    import migrate
+    migrate.upgrade()
+    moved = compact_notifications(
+        older_than_days=args.days,
+        batch_size=args.batch_size,
+        archive=NOTIFICATION_RETENTION_ARCHIVE and not args.delete,
+    )
+    action = "Deleted" if args.delete or not NOTIFICATION_RETENTION_ARCHIVE else "Archived"
+    print(f"✓ {action} {moved} read notifications older than {args.days:g} days")
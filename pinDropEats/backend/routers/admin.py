@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from database import get_db
-from auth import require_role
+from auth import require_role, CurrentUser
+from catalog_cache import invalidate_restaurant
+from stats import read_stats, rebuild_stats, to_platform_stats
+from analytics import query_rollups
+from export import export_response
 import models
 import schemas
 
@@ -13,7 +18,7 @@ router = APIRouter(prefix="/api/admin", tags=["Admin"])
 @router.get("/restaurants", response_model=list[schemas.RestaurantResponse])
 def list_all_restaurants(
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     return db.query(models.Restaurant).all()
 
@@ -22,12 +27,13 @@ def list_all_restaurants(
 def add_restaurant(
     data: schemas.RestaurantCreate,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     rest = models.Restaurant(**data.model_dump())
     db.add(rest)
     db.commit()
     db.refresh(rest)
+    invalidate_restaurant(rest.id, rest.pin_code)
     return rest
 
 
@@ -36,15 +42,17 @@ def update_restaurant(
     restaurant_id: int,
     data: schemas.RestaurantUpdate,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     rest = db.query(models.Restaurant).filter(models.Restaurant.id == restaurant_id).first()
     if not rest:
         raise HTTPException(status_code=404, detail="Restaurant not found")
+    old_pin_code = rest.pin_code
     for key, val in data.model_dump(exclude_unset=True).items():
         setattr(rest, key, val)
     db.commit()
     db.refresh(rest)
+    invalidate_restaurant(rest.id, old_pin_code, rest.pin_code)
     return rest
 
 
@@ -52,7 +60,7 @@ def update_restaurant(
 @router.get("/offers", response_model=list[schemas.OfferResponse])
 def list_platform_offers(
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     return db.query(models.Offer).filter(models.Offer.applicable_type == "platform").all()
 
@@ -61,7 +69,7 @@ def list_platform_offers(
 def create_platform_offer(
     data: schemas.OfferCreate,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     if data.applicable_type != "platform":
         raise HTTPException(status_code=400, detail="Admin can only create platform-level offers")
@@ -76,7 +84,7 @@ def create_platform_offer(
 def delete_offer(
     offer_id: int,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
     offer = db.query(models.Offer).filter(models.Offer.id == offer_id).first()
     if not offer:
@@ -89,28 +97,50 @@ def delete_offer(
 # ── Statistics ───────────────────────────────────────
 @router.get("/stats", response_model=schemas.PlatformStats)
 def get_platform_stats(
+    fresh: bool = False,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("admin")),
+    _user: CurrentUser = Depends(require_role("admin")),
 ):
-    total_orders = db.query(models.Order).count()
-    total_revenue = db.query(func.coalesce(func.sum(models.Order.total_amount), 0)).scalar()
-    total_restaurants = db.query(models.Restaurant).count()
-    total_customers = db.query(models.User).filter(models.User.role == "customer").count()
-    total_dp = db.query(models.DeliveryPartner).count()
-
-    # Orders grouped by status
-    status_counts = (
-        db.query(models.Order.order_status, func.count(models.Order.id))
-        .group_by(models.Order.order_status)
-        .all()
-    )
-    orders_by_status = {s: c for s, c in status_counts}
-
-    return schemas.PlatformStats(
-        total_orders=total_orders,
-        total_revenue=float(total_revenue),
-        total_restaurants=total_restaurants,
-        total_customers=total_customers,
-        total_delivery_partners=total_dp,
-        orders_by_status=orders_by_status,
-    )
+    """Served from the maintained counters; `?fresh=true` recomputes them first."""
+    if fresh:
+        counters = rebuild_stats(db)
+        db.commit()
+    else:
+        counters = read_stats(db)
+    return to_platform_stats(counters)
+
+
+# ── Export ───────────────────────────────────────────
+@router.get("/orders/export")
+def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    restaurant_id: Optional[int] = None,
+    start: Optional[schemas.UtcDatetime] = Query(None, description="Inclusive, UTC unless an offset is given"),
+    end: Optional[schemas.UtcDatetime] = Query(None, description="Exclusive, UTC unless an offset is given"),
+    _user: CurrentUser = Depends(require_role("admin")),
+):
+    """Stream orders across the platform or for one restaurant, oldest first."""
+    return export_response(format, "orders", restaurant_id, start, end)
+
+
+# ── Analytics ────────────────────────────────────────
+DEFAULT_ANALYTICS_WINDOW = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+@router.get("/analytics", response_model=list[schemas.AnalyticsBucket])
+def get_analytics(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[schemas.UtcDatetime] = Query(None, description="UTC unless an offset is given; defaults to 48 hours / 30 days before end"),
+    end: Optional[schemas.UtcDatetime] = Query(None, description="Exclusive, UTC unless an offset is given; defaults to now"),
+    restaurant_id: Optional[int] = None,
+    pin_code: Optional[str] = None,
+    group_by: Optional[str] = Query(None, pattern="^(restaurant|pin_code)$"),
+    db: Session = Depends(get_db),
+    _user: CurrentUser = Depends(require_role("admin")),
+):
+    """Orders, revenue, discounts and fees per hour or day, from the rollup table."""
+    end = end or datetime.utcnow()
+    start = start or end - DEFAULT_ANALYTICS_WINDOW[granularity]
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return query_rollups(db, granularity, start, end, restaurant_id, pin_code, group_by)
@@ -1,8 +1,16 @@
-import random
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from auth import require_role, create_notification, get_current_user
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from database import get_db, get_async_db
+from auth import require_role, get_current_user, CurrentUser
+from notifications import create_notification, unread
+from orders import select_orders, set_status, to_order_response, to_order_responses
+from pagination import PageParams, paginate, paginate_async
+from catalog_cache import catalog, conditional_response, menu_key, restaurants_key
+import eta
+import geo
 import models
 import schemas
 
@@ -11,42 +19,73 @@ router = APIRouter(prefix="/api/customer", tags=["Customer"])
 
 # ── Browse Restaurants ───────────────────────────────
 @router.get("/restaurants", response_model=list[schemas.RestaurantResponse])
-def browse_restaurants(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+async def browse_restaurants(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    """Customers only see restaurants in their pin code area."""
-    return (
-        db.query(models.Restaurant)
-        .filter(
-            models.Restaurant.pin_code == user.pin_code,
-            models.Restaurant.status == "active",
+    """Customers only see restaurants in their pin code area.
+
+    The area is the customer's own pin code, plus neighbouring ones when
+    BROWSE_RADIUS_KM is set; nearer pin codes are listed first.
+    """
+    area = geo.browse_area(user.pin_code)
+
+    async def load():
+        restaurants = await db.scalars(
+            select(models.Restaurant).where(
+                models.Restaurant.pin_code.in_(area),
+                models.Restaurant.status == "active",
+            )
         )
-        .all()
-    )
+        rank = {pin: i for i, pin in enumerate(area)}
+        return [
+            schemas.RestaurantResponse.model_validate(r).model_dump()
+            for r in sorted(restaurants, key=lambda r: rank[r.pin_code])
+        ]
+
+    etag, restaurants = await catalog.get_async(restaurants_key(user.pin_code), load)
+    return conditional_response(response, etag, if_none_match) or restaurants
 
 
 @router.get("/restaurants/{restaurant_id}/menu", response_model=list[schemas.DishResponse])
-def view_menu(
+async def view_menu(
     restaurant_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    rest = db.query(models.Restaurant).filter(models.Restaurant.id == restaurant_id).first()
-    if not rest:
-        raise HTTPException(status_code=404, detail="Restaurant not found")
-    if rest.pin_code != user.pin_code:
+    async def load():
+        rest = await db.get(models.Restaurant, restaurant_id)
+        if not rest:
+            raise HTTPException(status_code=404, detail="Restaurant not found")
+        dishes = await db.scalars(
+            select(models.Dish).where(models.Dish.restaurant_id == restaurant_id)
+        )
+        return {
+            "pin_code": rest.pin_code,
+            "dishes": [schemas.DishResponse.model_validate(d).model_dump() for d in dishes],
+        }
+
+    etag, menu = await catalog.get_async(menu_key(restaurant_id), load)
+    if menu["pin_code"] not in geo.browse_area(user.pin_code):
         raise HTTPException(status_code=403, detail="Restaurant not in your area")
-    return db.query(models.Dish).filter(models.Dish.restaurant_id == restaurant_id).all()
+    return conditional_response(response, etag, if_none_match) or menu["dishes"]
 
 
 # ── Cart ─────────────────────────────────────────────
 @router.get("/cart", response_model=list[schemas.CartItemResponse])
-def get_cart(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+async def get_cart(
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    items = db.query(models.Cart).filter(models.Cart.customer_id == user.id).all()
+    items = await db.scalars(
+        select(models.Cart)
+        .options(joinedload(models.Cart.dish), joinedload(models.Cart.restaurant))
+        .where(models.Cart.customer_id == user.id)
+    )
     result = []
     for c in items:
         result.append(schemas.CartItemResponse(
@@ -66,7 +105,7 @@ def get_cart(
 def add_to_cart(
     data: schemas.CartAdd,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     dish = db.query(models.Dish).filter(models.Dish.id == data.dish_id).first()
     if not dish:
@@ -75,7 +114,7 @@ def add_to_cart(
         raise HTTPException(status_code=400, detail="This dish is currently unavailable")
 
     rest = db.query(models.Restaurant).filter(models.Restaurant.id == dish.restaurant_id).first()
-    if rest.pin_code != user.pin_code:
+    if rest.pin_code not in geo.browse_area(user.pin_code):
         raise HTTPException(status_code=403, detail="Restaurant not in your area")
 
     # Check if dish from a different restaurant already in cart
@@ -132,7 +171,7 @@ def add_to_cart(
 def remove_from_cart(
     item_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     item = (
         db.query(models.Cart)
@@ -149,7 +188,7 @@ def remove_from_cart(
 @router.delete("/cart")
 def clear_cart(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     db.query(models.Cart).filter(models.Cart.customer_id == user.id).delete()
     db.commit()
@@ -161,7 +200,7 @@ def clear_cart(
 def get_eligible_offers(
     restaurant_id: int = None,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     """Get platform offers + restaurant offers for a given restaurant."""
     query = db.query(models.Offer).filter(models.Offer.active == True)
@@ -183,7 +222,7 @@ def get_eligible_offers(
 def checkout(
     data: schemas.CheckoutRequest,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     cart_items = db.query(models.Cart).filter(models.Cart.customer_id == user.id).all()
     if not cart_items:
@@ -193,18 +232,22 @@ def checkout(
     restaurant_id = cart_items[0].restaurant_id
     rest = db.query(models.Restaurant).filter(models.Restaurant.id == restaurant_id).first()
 
-    # Re-validate availability
+    # Re-validate availability (one IN query for every dish in the cart)
+    dish_ids = {ci.dish_id for ci in cart_items}
+    dishes = {
+        d.id: d
+        for d in db.query(models.Dish).filter(models.Dish.id.in_(dish_ids)).all()
+    }
     subtotal = 0.0
     order_items_data = []
     for ci in cart_items:
-        dish = db.query(models.Dish).filter(models.Dish.id == ci.dish_id).first()
+        dish = dishes.get(ci.dish_id)
         if not dish or not dish.availability:
             raise HTTPException(
                 status_code=400,
                 detail=f"Dish '{dish.name if dish else ci.dish_id}' is no longer available",
             )
-        item_total = dish.price * ci.quantity
-        subtotal += item_total
+        subtotal += dish.price * ci.quantity
         order_items_data.append({
             "dish_id": dish.id,
             "quantity": ci.quantity,
@@ -229,11 +272,6 @@ def checkout(
     restaurant_fee = rest.restaurant_fee
     total = subtotal + restaurant_fee - discount
 
-    # Estimate delivery time: base 25 min + 2 min per item, ±5 min randomness
-    total_items = sum(ci.quantity for ci in cart_items)
-    estimated_time = 25 + (total_items * 2) + random.randint(-5, 5)
-    estimated_time = max(estimated_time, 15)
-
     order = models.Order(
         customer_id=user.id,
         restaurant_id=restaurant_id,
@@ -241,33 +279,35 @@ def checkout(
         discount_amount=round(discount, 2),
         restaurant_fee=restaurant_fee,
         payment_mode=data.payment_mode,
-        order_status="Placed",
         offer_id=data.offer_id,
-        estimated_delivery_time=estimated_time,
+        # From the restaurant's recent prep times, its kitchen queue and
+        # recent delivery times in its pin code
+        estimated_delivery_time=eta.model.estimate(restaurant_id, rest.pin_code),
     )
+    set_status(db, order, "Placed")
     db.add(order)
     db.flush()
 
+    # One multi-row INSERT for all items (the ORM flush would insert them
+    # one by one to collect ids); ids are matched back by dish.
     for oi in order_items_data:
-        db.add(models.OrderItem(order_id=order.id, **oi))
-
-    # Clear cart
+        oi["order_id"] = order.id
+    item_ids = {}
+    for item_id, dish_id in db.execute(
+        insert(models.OrderItem)
+        .values(order_items_data)
+        .returning(models.OrderItem.id, models.OrderItem.dish_id)
+    ):
+        item_ids.setdefault(dish_id, []).append(item_id)
+
+    # Clear cart and notify the restaurant owner in the same transaction
     db.query(models.Cart).filter(models.Cart.customer_id == user.id).delete()
-    db.commit()
-    db.refresh(order)
-
-    # Notify restaurant owner
     if rest.owner_id:
         create_notification(db, rest.owner_id, f"New order #{order.id} received!")
 
-    items = []
-    for item in order.items:
-        items.append(schemas.OrderItemResponse(
-            id=item.id, dish_id=item.dish_id, quantity=item.quantity,
-            price=item.price, dish_name=item.dish.name if item.dish else None,
-        ))
-
-    return schemas.OrderResponse(
+    # Built before commit: commit expires the objects, and reading them
+    # afterwards would reload every row.
+    response = schemas.OrderResponse(
         id=order.id,
         customer_id=order.customer_id,
         restaurant_id=order.restaurant_id,
@@ -279,91 +319,46 @@ def checkout(
         delivery_partner_id=order.delivery_partner_id,
         estimated_delivery_time=order.estimated_delivery_time,
         created_at=order.created_at,
-        items=items,
+        items=[
+            schemas.OrderItemResponse(
+                id=item_ids[oi["dish_id"]].pop(0), dish_id=oi["dish_id"], quantity=oi["quantity"],
+                price=oi["price"], dish_name=dishes[oi["dish_id"]].name,
+            )
+            for oi in order_items_data
+        ],
         restaurant_name=rest.name,
+        customer_name=user.name,
     )
+    db.commit()
+    return response
 
 
 # ── Orders ───────────────────────────────────────────
-@router.get("/orders", response_model=list[schemas.OrderResponse])
-def my_orders(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+@router.get("/orders", response_model=schemas.OrderPage)
+async def my_orders(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.customer_id == user.id)
-        .order_by(models.Order.created_at.desc())
-        .all()
+    orders, next_cursor = await paginate_async(
+        db, select_orders().where(models.Order.customer_id == user.id),
+        models.Order, page,
     )
-    result = []
-    for o in orders:
-        items = []
-        for item in o.items:
-            items.append(schemas.OrderItemResponse(
-                id=item.id, dish_id=item.dish_id, quantity=item.quantity,
-                price=item.price, dish_name=item.dish.name if item.dish else None,
-            ))
-        dp_name = None
-        if o.delivery_partner and o.delivery_partner.user:
-            dp_name = o.delivery_partner.user.name
-        result.append(schemas.OrderResponse(
-            id=o.id,
-            customer_id=o.customer_id,
-            restaurant_id=o.restaurant_id,
-            total_amount=o.total_amount,
-            discount_amount=o.discount_amount,
-            restaurant_fee=o.restaurant_fee,
-            payment_mode=o.payment_mode,
-            order_status=o.order_status,
-            delivery_partner_id=o.delivery_partner_id,
-            estimated_delivery_time=o.estimated_delivery_time,
-            created_at=o.created_at,
-            items=items,
-            restaurant_name=o.restaurant.name if o.restaurant else None,
-            delivery_partner_name=dp_name,
-        ))
-    return result
+    return schemas.OrderPage(items=to_order_responses(orders), next_cursor=next_cursor)
 
 
 @router.get("/orders/{order_id}", response_model=schemas.OrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    o = (
-        db.query(models.Order)
-        .filter(models.Order.id == order_id, models.Order.customer_id == user.id)
-        .first()
+    o = await db.scalar(
+        select_orders().where(models.Order.id == order_id, models.Order.customer_id == user.id)
     )
     if not o:
         raise HTTPException(status_code=404, detail="Order not found")
-    items = []
-    for item in o.items:
-        items.append(schemas.OrderItemResponse(
-            id=item.id, dish_id=item.dish_id, quantity=item.quantity,
-            price=item.price, dish_name=item.dish.name if item.dish else None,
-        ))
-    dp_name = None
-    if o.delivery_partner and o.delivery_partner.user:
-        dp_name = o.delivery_partner.user.name
-    return schemas.OrderResponse(
-        id=o.id,
-        customer_id=o.customer_id,
-        restaurant_id=o.restaurant_id,
-        total_amount=o.total_amount,
-        discount_amount=o.discount_amount,
-        restaurant_fee=o.restaurant_fee,
-        payment_mode=o.payment_mode,
-        order_status=o.order_status,
-        delivery_partner_id=o.delivery_partner_id,
-        estimated_delivery_time=o.estimated_delivery_time,
-        created_at=o.created_at,
-        items=items,
-        restaurant_name=o.restaurant.name if o.restaurant else None,
-        delivery_partner_name=dp_name,
-    )
+    return to_order_response(o)
 
 
 # ── Reorder (Innovation Feature) ────────────────────
@@ -371,7 +366,7 @@ def get_order(
 def reorder(
     order_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     """Reorder: adds items from a past order back to cart."""
     old_order = (
@@ -414,7 +409,7 @@ def reorder(
 def raise_complaint(
     data: schemas.ComplaintCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
     order = (
         db.query(models.Order)
@@ -444,51 +439,53 @@ def raise_complaint(
     )
 
 
-@router.get("/complaints", response_model=list[schemas.ComplaintResponse])
+@router.get("/complaints", response_model=schemas.ComplaintPage)
 def my_complaints(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("customer")),
+    user: CurrentUser = Depends(require_role("customer")),
 ):
-    complaints = (
-        db.query(models.Complaint)
-        .filter(models.Complaint.customer_id == user.id)
-        .order_by(models.Complaint.created_at.desc())
-        .all()
+    complaints, next_cursor = paginate(
+        db.query(models.Complaint).filter(models.Complaint.customer_id == user.id),
+        models.Complaint, page,
+    )
+    return schemas.ComplaintPage(
+        items=[
+            schemas.ComplaintResponse(
+                id=c.id, order_id=c.order_id, customer_id=c.customer_id,
+                description=c.description, status=c.status,
+                resolution_notes=c.resolution_notes, created_at=c.created_at,
+                customer_name=user.name,
+            )
+            for c in complaints
+        ],
+        next_cursor=next_cursor,
     )
-    return [
-        schemas.ComplaintResponse(
-            id=c.id, order_id=c.order_id, customer_id=c.customer_id,
-            description=c.description, status=c.status,
-            resolution_notes=c.resolution_notes, created_at=c.created_at,
-            customer_name=user.name,
-        )
-        for c in complaints
-    ]
 
 
 # ── Notifications ────────────────────────────────────
-@router.get("/notifications", response_model=list[schemas.NotificationResponse])
-def get_notifications(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+@router.get("/notifications", response_model=schemas.NotificationPage)
+async def get_notifications(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    return (
-        db.query(models.Notification)
-        .filter(models.Notification.user_id == user.id)
-        .order_by(models.Notification.created_at.desc())
-        .limit(20)
-        .all()
+    notifs, next_cursor = await paginate_async(
+        db, select(models.Notification).where(models.Notification.user_id == user.id),
+        models.Notification, page,
     )
+    return schemas.NotificationPage(items=notifs, next_cursor=next_cursor)
 
 
 @router.put("/notifications/read")
 def mark_notifications_read(
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     db.query(models.Notification).filter(
         models.Notification.user_id == user.id,
         models.Notification.is_read == False,
     ).update({"is_read": True})
     db.commit()
+    unread.invalidate(user.id)
     return {"message": "All notifications marked as read"}
@@ -1,7 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from auth import require_role, create_notification
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from database import get_db, get_async_db
+from auth import require_role, CurrentUser
+from notifications import create_notification
+from dispatch import release_partner
+from orders import select_orders, set_status, to_order_responses
+from pagination import PageParams, paginate, paginate_async
 import models
 import schemas
 
@@ -9,19 +14,18 @@ router = APIRouter(prefix="/api/care", tags=["Customer Care"])
 
 
 # ── Complaints ───────────────────────────────────────
-@router.get("/complaints", response_model=list[schemas.ComplaintResponse])
+@router.get("/complaints", response_model=schemas.ComplaintPage)
 def list_all_complaints(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("care")),
+    _user: CurrentUser = Depends(require_role("care")),
 ):
-    complaints = (
-        db.query(models.Complaint)
-        .order_by(models.Complaint.created_at.desc())
-        .all()
+    complaints, next_cursor = paginate(
+        db.query(models.Complaint).options(joinedload(models.Complaint.customer)),
+        models.Complaint, page,
     )
     result = []
     for c in complaints:
-        cust = db.query(models.User).filter(models.User.id == c.customer_id).first()
         result.append(schemas.ComplaintResponse(
             id=c.id,
             order_id=c.order_id,
@@ -30,9 +34,9 @@ def list_all_complaints(
             status=c.status,
             resolution_notes=c.resolution_notes,
             created_at=c.created_at,
-            customer_name=cust.name if cust else None,
+            customer_name=c.customer.name if c.customer else None,
         ))
-    return result
+    return schemas.ComplaintPage(items=result, next_cursor=next_cursor)
 
 
 @router.put("/complaints/{complaint_id}", response_model=schemas.ComplaintResponse)
@@ -40,9 +44,14 @@ def update_complaint(
     complaint_id: int,
     data: schemas.ComplaintUpdate,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("care")),
+    _user: CurrentUser = Depends(require_role("care")),
 ):
-    complaint = db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+    complaint = (
+        db.query(models.Complaint)
+        .options(joinedload(models.Complaint.customer))
+        .filter(models.Complaint.id == complaint_id)
+        .first()
+    )
     if not complaint:
         raise HTTPException(status_code=404, detail="Complaint not found")
 
@@ -58,17 +67,13 @@ def update_complaint(
     if data.resolution_notes:
         complaint.resolution_notes = data.resolution_notes
 
-    db.commit()
-    db.refresh(complaint)
-
     # Notify customer about complaint update
     create_notification(
         db, complaint.customer_id,
         f"Complaint #{complaint.id} updated to: {complaint.status}"
     )
 
-    cust = db.query(models.User).filter(models.User.id == complaint.customer_id).first()
-    return schemas.ComplaintResponse(
+    response = schemas.ComplaintResponse(
         id=complaint.id,
         order_id=complaint.order_id,
         customer_id=complaint.customer_id,
@@ -76,8 +81,10 @@ def update_complaint(
         status=complaint.status,
         resolution_notes=complaint.resolution_notes,
         created_at=complaint.created_at,
-        customer_name=cust.name if cust else None,
+        customer_name=complaint.customer.name if complaint.customer else None,
     )
+    db.commit()
+    return response
 
 
 # ── Cancel Order ─────────────────────────────────────
@@ -85,7 +92,7 @@ def update_complaint(
 def cancel_order(
     order_id: int,
     db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("care")),
+    _user: CurrentUser = Depends(require_role("care")),
 ):
     order = db.query(models.Order).filter(models.Order.id == order_id).first()
     if not order:
@@ -98,67 +105,28 @@ def cancel_order(
             detail=f"Cannot cancel order with status '{order.order_status}'",
         )
 
-    order.order_status = "Cancelled"
+    set_status(db, order, "Cancelled")
 
     # Free up delivery partner if assigned
     if order.delivery_partner_id:
-        partner = (
-            db.query(models.DeliveryPartner)
-            .filter(models.DeliveryPartner.id == order.delivery_partner_id)
-            .first()
-        )
-        if partner:
-            partner.availability = True
-
-    db.commit()
+        release_partner(db, order.delivery_partner_id)
 
     # Notify customer
     create_notification(
         db, order.customer_id,
         f"Order #{order.id} has been cancelled by customer care."
     )
+    db.commit()
 
     return {"message": f"Order #{order_id} cancelled successfully"}
 
 
 # ── View Orders (for reference during complaints) ────
-@router.get("/orders", response_model=list[schemas.OrderResponse])
-def list_all_orders(
-    db: Session = Depends(get_db),
-    _user: models.User = Depends(require_role("care")),
+@router.get("/orders", response_model=schemas.OrderPage)
+async def list_all_orders(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    _user: CurrentUser = Depends(require_role("care")),
 ):
-    orders = (
-        db.query(models.Order)
-        .order_by(models.Order.created_at.desc())
-        .limit(100)
-        .all()
-    )
-    result = []
-    for o in orders:
-        items = []
-        for item in o.items:
-            items.append(schemas.OrderItemResponse(
-                id=item.id, dish_id=item.dish_id, quantity=item.quantity,
-                price=item.price, dish_name=item.dish.name if item.dish else None,
-            ))
-        dp_name = None
-        if o.delivery_partner and o.delivery_partner.user:
-            dp_name = o.delivery_partner.user.name
-        result.append(schemas.OrderResponse(
-            id=o.id,
-            customer_id=o.customer_id,
-            restaurant_id=o.restaurant_id,
-            total_amount=o.total_amount,
-            discount_amount=o.discount_amount,
-            restaurant_fee=o.restaurant_fee,
-            payment_mode=o.payment_mode,
-            order_status=o.order_status,
-            delivery_partner_id=o.delivery_partner_id,
-            estimated_delivery_time=o.estimated_delivery_time,
-            created_at=o.created_at,
-            items=items,
-            restaurant_name=o.restaurant.name if o.restaurant else None,
-            customer_name=o.customer.name if o.customer else None,
-            delivery_partner_name=dp_name,
-        ))
-    return result
+    orders, next_cursor = await paginate_async(db, select_orders(), models.Order, page)
+    return schemas.OrderPage(items=to_order_responses(orders), next_cursor=next_cursor)
@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
-from auth import require_role, create_notification
+from database import get_db, get_async_db
+from auth import require_role, CurrentUser
+from notifications import create_notification
+from dispatch import release_partner, withdraw_partner
+from orders import select_orders, set_status, to_order_responses
+from pagination import PageParams, paginate_async
 import models
 import schemas
 
 router = APIRouter(prefix="/api/delivery", tags=["Delivery Partner"])
 
 
-def _get_partner(db: Session, user: models.User) -> models.DeliveryPartner:
+def _get_partner(db: Session, user: CurrentUser) -> models.DeliveryPartner:
     partner = (
         db.query(models.DeliveryPartner)
         .filter(models.DeliveryPartner.user_id == user.id)
@@ -19,14 +25,26 @@ def _get_partner(db: Session, user: models.User) -> models.DeliveryPartner:
     return partner
 
 
+async def _get_partner_async(db: AsyncSession, user: CurrentUser) -> models.DeliveryPartner:
+    partner = await db.scalar(
+        select(models.DeliveryPartner).where(models.DeliveryPartner.user_id == user.id)
+    )
+    if not partner:
+        raise HTTPException(status_code=404, detail="Delivery partner profile not found")
+    return partner
+
+
 # ── Availability Toggle ──────────────────────────────
 @router.put("/availability")
 def toggle_availability(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("delivery")),
+    user: CurrentUser = Depends(require_role("delivery")),
 ):
     partner = _get_partner(db, user)
-    partner.availability = not partner.availability
+    if partner.availability:
+        withdraw_partner(db, partner)
+    else:
+        release_partner(db, partner.id)
     db.commit()
     status = "available" if partner.availability else "offline"
     return {"message": f"You are now {status}", "availability": partner.availability}
@@ -35,7 +53,7 @@ def toggle_availability(
 @router.get("/status", response_model=schemas.DeliveryPartnerResponse)
 def get_my_status(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("delivery")),
+    user: CurrentUser = Depends(require_role("delivery")),
 ):
     partner = _get_partner(db, user)
     return schemas.DeliveryPartnerResponse(
@@ -48,43 +66,18 @@ def get_my_status(
 
 
 # ── Assigned Orders ──────────────────────────────────
-@router.get("/orders", response_model=list[schemas.OrderResponse])
-def get_assigned_orders(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("delivery")),
+@router.get("/orders", response_model=schemas.OrderPage)
+async def get_assigned_orders(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("delivery")),
 ):
-    partner = _get_partner(db, user)
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.delivery_partner_id == partner.id)
-        .order_by(models.Order.created_at.desc())
-        .all()
+    partner = await _get_partner_async(db, user)
+    orders, next_cursor = await paginate_async(
+        db, select_orders().where(models.Order.delivery_partner_id == partner.id),
+        models.Order, page,
     )
-    result = []
-    for o in orders:
-        items = []
-        for item in o.items:
-            items.append(schemas.OrderItemResponse(
-                id=item.id, dish_id=item.dish_id, quantity=item.quantity,
-                price=item.price, dish_name=item.dish.name if item.dish else None,
-            ))
-        result.append(schemas.OrderResponse(
-            id=o.id,
-            customer_id=o.customer_id,
-            restaurant_id=o.restaurant_id,
-            total_amount=o.total_amount,
-            discount_amount=o.discount_amount,
-            restaurant_fee=o.restaurant_fee,
-            payment_mode=o.payment_mode,
-            order_status=o.order_status,
-            delivery_partner_id=o.delivery_partner_id,
-            estimated_delivery_time=o.estimated_delivery_time,
-            created_at=o.created_at,
-            items=items,
-            restaurant_name=o.restaurant.name if o.restaurant else None,
-            customer_name=o.customer.name if o.customer else None,
-        ))
-    return result
+    return schemas.OrderPage(items=to_order_responses(orders), next_cursor=next_cursor)
 
 
 # ── Mark Delivered ───────────────────────────────────
@@ -92,7 +85,7 @@ def get_assigned_orders(
 def mark_delivered(
     order_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("delivery")),
+    user: CurrentUser = Depends(require_role("delivery")),
 ):
     partner = _get_partner(db, user)
     order = (
@@ -109,14 +102,14 @@ def mark_delivered(
             detail=f"Cannot mark as delivered. Current status: '{order.order_status}'. Must be 'Out for Delivery'.",
         )
 
-    order.order_status = "Delivered"
-    partner.availability = True  # Free up the delivery partner
-    db.commit()
+    set_status(db, order, "Delivered")
+    release_partner(db, partner.id)  # Free up the delivery partner
 
     # Notify customer
     create_notification(
         db, order.customer_id,
         f"Order #{order.id} has been delivered! Enjoy your meal! 🍽️"
     )
+    db.commit()
 
     return {"message": "Order marked as delivered"}
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
-from auth import require_role, create_notification
+from database import get_db, get_async_db
+from auth import require_role, CurrentUser
+from notifications import create_notification
+from dispatch import claim_partner, claim_partners, DISPATCH_FAILURES
+from orders import select_orders, set_status, to_order_responses
+from pagination import PageParams, paginate_async
+from catalog_cache import invalidate_restaurant
+from export import export_response
 import models
 import schemas
 
@@ -14,18 +23,27 @@ VALID_OWNER_TRANSITIONS = {
 }
 
 
-def _get_owner_restaurant(db: Session, user: models.User) -> models.Restaurant:
+def _get_owner_restaurant(db: Session, user: CurrentUser) -> models.Restaurant:
     rest = db.query(models.Restaurant).filter(models.Restaurant.owner_id == user.id).first()
     if not rest:
         raise HTTPException(status_code=404, detail="No restaurant linked to your account")
     return rest
 
 
+async def _get_owner_restaurant_async(db: AsyncSession, user: CurrentUser) -> models.Restaurant:
+    rest = await db.scalar(
+        select(models.Restaurant).where(models.Restaurant.owner_id == user.id).limit(1)
+    )
+    if not rest:
+        raise HTTPException(status_code=404, detail="No restaurant linked to your account")
+    return rest
+
+
 # ── Dishes ───────────────────────────────────────────
 @router.get("/dishes", response_model=list[schemas.DishResponse])
 def list_my_dishes(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     return db.query(models.Dish).filter(models.Dish.restaurant_id == rest.id).all()
@@ -35,7 +53,7 @@ def list_my_dishes(
 def add_dish(
     data: schemas.DishCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     if data.restaurant_id != rest.id:
@@ -44,6 +62,7 @@ def add_dish(
     db.add(dish)
     db.commit()
     db.refresh(dish)
+    invalidate_restaurant(rest.id)
     return dish
 
 
@@ -52,7 +71,7 @@ def update_dish(
     dish_id: int,
     data: schemas.DishUpdate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     dish = (
@@ -66,6 +85,7 @@ def update_dish(
         setattr(dish, key, val)
     db.commit()
     db.refresh(dish)
+    invalidate_restaurant(rest.id)
     return dish
 
 
@@ -73,7 +93,7 @@ def update_dish(
 def remove_dish(
     dish_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     dish = (
@@ -85,50 +105,36 @@ def remove_dish(
         raise HTTPException(status_code=404, detail="Dish not found in your restaurant")
     db.delete(dish)
     db.commit()
+    invalidate_restaurant(rest.id)
     return {"message": "Dish removed"}
 
 
 # ── Orders ───────────────────────────────────────────
-@router.get("/orders", response_model=list[schemas.OrderResponse])
-def list_restaurant_orders(
+@router.get("/orders", response_model=schemas.OrderPage)
+async def list_restaurant_orders(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(require_role("owner")),
+):
+    rest = await _get_owner_restaurant_async(db, user)
+    orders, next_cursor = await paginate_async(
+        db, select_orders().where(models.Order.restaurant_id == rest.id),
+        models.Order, page,
+    )
+    return schemas.OrderPage(items=to_order_responses(orders), next_cursor=next_cursor)
+
+
+@router.get("/orders/export")
+def export_restaurant_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start: Optional[schemas.UtcDatetime] = Query(None, description="Inclusive, UTC unless an offset is given"),
+    end: Optional[schemas.UtcDatetime] = Query(None, description="Exclusive, UTC unless an offset is given"),
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
+    """Stream every order of my restaurant (optionally within a date range), oldest first."""
     rest = _get_owner_restaurant(db, user)
-    orders = (
-        db.query(models.Order)
-        .filter(models.Order.restaurant_id == rest.id)
-        .order_by(models.Order.created_at.desc())
-        .all()
-    )
-    result = []
-    for o in orders:
-        items = []
-        for item in o.items:
-            items.append(schemas.OrderItemResponse(
-                id=item.id,
-                dish_id=item.dish_id,
-                quantity=item.quantity,
-                price=item.price,
-                dish_name=item.dish.name if item.dish else None,
-            ))
-        result.append(schemas.OrderResponse(
-            id=o.id,
-            customer_id=o.customer_id,
-            restaurant_id=o.restaurant_id,
-            total_amount=o.total_amount,
-            discount_amount=o.discount_amount,
-            restaurant_fee=o.restaurant_fee,
-            payment_mode=o.payment_mode,
-            order_status=o.order_status,
-            delivery_partner_id=o.delivery_partner_id,
-            estimated_delivery_time=o.estimated_delivery_time,
-            created_at=o.created_at,
-            items=items,
-            restaurant_name=rest.name,
-            customer_name=o.customer.name if o.customer else None,
-        ))
-    return result
+    return export_response(format, f"orders-restaurant-{rest.id}", rest.id, start, end)
 
 
 @router.put("/orders/{order_id}/status")
@@ -136,7 +142,7 @@ def update_order_status(
     order_id: int,
     data: schemas.OrderStatusUpdate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     order = (
@@ -158,41 +164,77 @@ def update_order_status(
 
     # If transitioning to Out for Delivery, assign a delivery partner
     if new_status == "Out for Delivery":
-        partner = (
-            db.query(models.DeliveryPartner)
-            .filter(
-                models.DeliveryPartner.availability == True,
-                models.DeliveryPartner.pin_code == rest.pin_code,
-            )
-            .first()
-        )
+        partner = claim_partner(db, rest.pin_code)
         if not partner:
+            DISPATCH_FAILURES.inc()
             raise HTTPException(
                 status_code=400,
                 detail="No delivery partner available in this area. Cannot send for delivery.",
             )
         order.delivery_partner_id = partner.id
-        partner.availability = False
         # Notify delivery partner
         create_notification(db, partner.user_id, f"New delivery assigned! Order #{order.id}")
 
-    order.order_status = new_status
-    db.commit()
+    set_status(db, order, new_status)
 
     # Notify customer
     create_notification(
         db, order.customer_id,
         f"Order #{order.id} status updated to: {new_status}"
     )
+    db.commit()
 
     return {"message": f"Order status updated to '{new_status}'"}
 
 
+@router.post("/orders/dispatch", response_model=schemas.BatchDispatchResponse)
+def dispatch_orders(
+    data: schemas.BatchDispatchRequest,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(require_role("owner")),
+):
+    """Send many 'Preparing' orders out for delivery in one transaction.
+
+    Oldest orders are matched first, each to the least-loaded free partner in
+    the restaurant's pin code. Requested orders that were not sent (no free
+    partner, wrong status or another restaurant's) are listed as unassigned.
+    """
+    rest = _get_owner_restaurant(db, user)
+    query = db.query(models.Order).filter(
+        models.Order.restaurant_id == rest.id,
+        models.Order.order_status == "Preparing",
+    )
+    if data.order_ids is not None:
+        query = query.filter(models.Order.id.in_(data.order_ids))
+    orders = query.order_by(models.Order.created_at, models.Order.id).all()
+
+    partners = claim_partners(db, rest.pin_code, len(orders))
+    assigned = []
+    for order, partner in zip(orders, partners):
+        order.delivery_partner_id = partner.id
+        set_status(db, order, "Out for Delivery")
+        create_notification(db, partner.user_id, f"New delivery assigned! Order #{order.id}")
+        create_notification(
+            db, order.customer_id,
+            f"Order #{order.id} status updated to: Out for Delivery"
+        )
+        assigned.append(schemas.DispatchAssignment(order_id=order.id, delivery_partner_id=partner.id))
+
+    sent = {a.order_id for a in assigned}
+    requested = data.order_ids if data.order_ids is not None else [o.id for o in orders]
+    response = schemas.BatchDispatchResponse(
+        assigned=assigned,
+        unassigned=[order_id for order_id in requested if order_id not in sent],
+    )
+    db.commit()
+    return response
+
+
 # ── Restaurant Offers ────────────────────────────────
 @router.get("/offers", response_model=list[schemas.OfferResponse])
 def list_restaurant_offers(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     return (
@@ -206,7 +248,7 @@ def list_restaurant_offers(
 def create_restaurant_offer(
     data: schemas.OfferCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     rest = _get_owner_restaurant(db, user)
     if data.applicable_type != "restaurant":
@@ -222,6 +264,6 @@ def create_restaurant_offer(
 @router.get("/restaurant", response_model=schemas.RestaurantResponse)
 def get_my_restaurant(
     db: Session = Depends(get_db),
-    user: models.User = Depends(require_role("owner")),
+    user: CurrentUser = Depends(require_role("owner")),
 ):
     return _get_owner_restaurant(db, user)
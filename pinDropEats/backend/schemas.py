@@ -1,6 +1,18 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, EmailStr, field_validator
+from typing import Annotated, Optional, List
+from datetime import datetime, timezone
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Offset-aware datetimes as naive UTC, the way every timestamp is stored."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Time-range query parameters: a bound with an offset (`Z`, `+05:30`) is
+# converted, a bound without one is taken as UTC
+UtcDatetime = Annotated[datetime, AfterValidator(to_naive_utc)]
 
 
 # ── Auth ─────────────────────────────────────────────
@@ -138,6 +150,11 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+
 class CheckoutRequest(BaseModel):
     payment_mode: str = "online"
     offer_id: Optional[int] = None
@@ -147,6 +164,20 @@ class OrderStatusUpdate(BaseModel):
     status: str
 
 
+class BatchDispatchRequest(BaseModel):
+    order_ids: Optional[List[int]] = None  # None = every order in 'Preparing'
+
+
+class DispatchAssignment(BaseModel):
+    order_id: int
+    delivery_partner_id: int
+
+
+class BatchDispatchResponse(BaseModel):
+    assigned: List[DispatchAssignment]
+    unassigned: List[int]
+
+
 # ── Offer ────────────────────────────────────────────
 class OfferCreate(BaseModel):
     description: str
@@ -232,6 +263,11 @@ class ComplaintResponse(BaseModel):
         from_attributes = True
 
 
+class ComplaintPage(BaseModel):
+    items: List[ComplaintResponse]
+    next_cursor: Optional[str] = None
+
+
 # ── Notification ─────────────────────────────────────
 class NotificationResponse(BaseModel):
     id: int
@@ -243,6 +279,20 @@ class NotificationResponse(BaseModel):
         from_attributes = True
 
 
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_cursor: Optional[str] = None
+
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
 # ── Delivery Partner ─────────────────────────────────
 class DeliveryPartnerResponse(BaseModel):
     id: int
@@ -256,6 +306,20 @@ class DeliveryPartnerResponse(BaseModel):
 
 
 # ── Stats ────────────────────────────────────────────
+class AnalyticsBucket(BaseModel):
+    bucket: datetime
+    restaurant_id: Optional[int] = None
+    pin_code: Optional[str] = None
+    orders: int
+    revenue: float
+    discount: float
+    restaurant_fee: float
+    delivered: int
+    delivered_revenue: float
+    cancelled: int
+    cancelled_revenue: float
+
+
 class PlatformStats(BaseModel):
     total_orders: int
     total_revenue: float
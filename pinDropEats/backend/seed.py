@@ -8,15 +8,18 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from database import engine, SessionLocal, Base
 from auth import hash_password
+from stats import rebuild_stats
+from analytics import rebuild_rollups
 import models
 
-# Reset DB
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
 
-db = SessionLocal()
+def reset_schema():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
 
-try:
+
+def seed_sample_data(db):
+    """The demo accounts, restaurants, dishes, partners and offers."""
     # ── Users ────────────────────────────────────────
     users = [
         models.User(name="Admin User", email="admin@pindrop.com", password=hash_password("password123"), role="admin", pin_code="110001"),
@@ -102,6 +105,8 @@ try:
     db.commit()
     print(f"✓ Created {len(offers)} offers")
 
+
+def print_accounts():
     print("\n" + "="*50)
     print("  SEED DATA LOADED SUCCESSFULLY!")
     print("="*50)
@@ -119,9 +124,22 @@ try:
     print(f"{'Care':<18} {'anita@care.com':<28} password123")
     print("-" * 50)
 
-except Exception as e:
-    print(f"Error: {e}")
-    db.rollback()
-    raise
-finally:
-    db.close()
+
+if __name__ == "__main__":
+    reset_schema()
+    db = SessionLocal()
+    try:
+        seed_sample_data(db)
+
+        # ── Admin dashboard counters & analytics ─────────
+        rebuild_stats(db)
+        rebuild_rollups(db)
+        db.commit()
+        print("✓ Built platform stats and analytics rollups")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print_accounts()
@@ -0,0 +1,141 @@
+"""
+Materialized platform statistics for the admin dashboard.
+
+`platform_stats` holds one counter row per figure (orders, revenue, customers,
+restaurants, delivery partners and one row per order status). Counters change
+in the same transaction as the rows they count: `orders.set_status` records
+order and status deltas, and new users, restaurants and partners are picked up
+when they are flushed. Each flush writes its deltas with a single upsert.
+Reading the dashboard is therefore one small SELECT however many orders exist.
+
+`rebuild_stats` recomputes everything from the base tables. It backs
+`GET /api/admin/stats?fresh=true`, fills the table on first start, and should
+be run after loading data without the ORM (`python stats.py`).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from collections import Counter
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import models
+import schemas
+
+DELTAS_KEY = "stats_deltas"
+STATUS_PREFIX = "status:"
+
+
+def record_status_change(db: Session, order: models.Order, previous: str, status: str):
+    """Count a placement (previous is None) or transition in `db`'s transaction."""
+    deltas = Counter({STATUS_PREFIX + status: 1})
+    if previous is None:
+        deltas.update(orders=1, revenue=order.total_amount or 0.0)
+    else:
+        deltas[STATUS_PREFIX + previous] -= 1
+    db.info.setdefault(DELTAS_KEY, Counter()).update(deltas)
+
+
+def upsert_adding(dialect_name: str, model, keys: list, values: list):
+    """INSERT that adds `values` onto an existing row with the same `keys`."""
+    module = {"sqlite": sqlite, "postgresql": postgresql}[dialect_name]
+    stmt = module.insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={col.name: col + stmt.excluded[col.name] for col in values},
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _write_deltas(session: Session, _flush_context):
+    deltas = session.info.pop(DELTAS_KEY, Counter())
+    for obj in session.new:
+        if isinstance(obj, models.User) and obj.role == "customer":
+            deltas["customers"] += 1
+        elif isinstance(obj, models.Restaurant):
+            deltas["restaurants"] += 1
+        elif isinstance(obj, models.DeliveryPartner):
+            deltas["delivery_partners"] += 1
+    rows = [{"key": key, "value": value} for key, value in deltas.items() if value]
+    if rows:
+        conn = session.connection()
+        stmt = upsert_adding(conn.dialect.name, models.PlatformStat, [models.PlatformStat.key], [models.PlatformStat.value])
+        conn.execute(stmt.values(rows))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session: Session):
+    session.info.pop(DELTAS_KEY, None)
+
+
+def compute_stats(db: Session) -> dict[str, float]:
+    """Every counter, aggregated from the base tables."""
+    counters = {
+        "orders": db.scalar(select(func.count()).select_from(models.Order)),
+        "revenue": db.scalar(select(func.coalesce(func.sum(models.Order.total_amount), 0))),
+        "restaurants": db.scalar(select(func.count()).select_from(models.Restaurant)),
+        "customers": db.scalar(select(func.count()).select_from(models.User).where(models.User.role == "customer")),
+        "delivery_partners": db.scalar(select(func.count()).select_from(models.DeliveryPartner)),
+    }
+    for status, count in db.execute(
+        select(models.Order.order_status, func.count()).group_by(models.Order.order_status)
+    ):
+        counters[STATUS_PREFIX + status] = count
+    return counters
+
+
+def rebuild_stats(db: Session) -> dict[str, float]:
+    """Replace the counters with freshly aggregated values (caller commits)."""
+    counters = compute_stats(db)
+    db.execute(delete(models.PlatformStat))
+    db.execute(insert(models.PlatformStat).values([{"key": k, "value": v} for k, v in counters.items()]))
+    return counters
+
+
+def read_stats(db: Session) -> dict[str, float]:
+    return dict(db.execute(select(models.PlatformStat.key, models.PlatformStat.value)).all())
+
+
+def ensure_stats(db: Session):
+    """Fill the counters if they have never been built (new or upgraded database)."""
+    if db.scalar(select(models.PlatformStat.key).limit(1)) is None:
+        rebuild_stats(db)
+        db.commit()
+
+
+def to_platform_stats(counters: dict[str, float]) -> schemas.PlatformStats:
+    return schemas.PlatformStats(
+        total_orders=int(counters.get("orders", 0)),
+        total_revenue=round(float(counters.get("revenue", 0)), 2),
+        total_restaurants=int(counters.get("restaurants", 0)),
+        total_customers=int(counters.get("customers", 0)),
+        total_delivery_partners=int(counters.get("delivery_partners", 0)),
+        orders_by_status={
+            key[len(STATUS_PREFIX):]: int(value)
+            for key, value in counters.items()
+            if key.startswith(STATUS_PREFIX) and value
+        },
+    )
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    import migrate
+
+    migrate.upgrade()
+    db = SessionLocal()
+    try:
+        before = read_stats(db)
+        after = rebuild_stats(db)
+        db.commit()
+    finally:
+        db.close()
+    drift = {
+        key: (before.get(key, 0), after.get(key, 0))
+        for key in before.keys() | after.keys()
+        if abs(before.get(key, 0) - after.get(key, 0)) > 1e-6
+    }
+    print(f"✓ Rebuilt {len(after)} counters")
+    for key, (old, new) in drift.items():
+        print(f"  {key}: {old:g} → {new:g}")
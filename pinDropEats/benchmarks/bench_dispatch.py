@@ -0,0 +1,190 @@
+"""
+Dispatch benchmark: first-match vs round-robin pool vs batch assignment.
+Run: python benchmarks/bench_dispatch.py [--pins 5 --partners 20 --rounds 50 --orders 8]
+
+Each round puts `--orders` orders per pin code into 'Preparing', assigns them
+with the strategy under test, then frees every partner again. Only the
+assignment step is timed. Fairness is the spread of orders per partner: with
+fewer orders than partners per round, first-match keeps handing work to the
+same low-id partners.
+
+Uses a throwaway SQLite file; the application database is never touched.
+"""
+import sys
+import os
+import argparse
+import statistics
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(prefix="pindrop-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from sqlalchemy import func, insert, select, update
+from database import engine, SessionLocal, Base
+import models
+import dispatch
+
+
+def setup(pins: int, partners: int) -> tuple[int, dict[str, int]]:
+    """Fresh schema with one restaurant and `partners` partners per pin code.
+
+    Returns the customer id and the restaurant id per pin code.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    pin_codes = [f"{560001 + i}" for i in range(pins)]
+    restaurants = {}
+    with engine.begin() as conn:
+        customer_id = conn.execute(insert(models.User).values(
+            name="Bench Customer", email="bench@customer.com", password="x", role="customer", pin_code=pin_codes[0],
+        )).inserted_primary_key[0]
+        for pin in pin_codes:
+            owner_id = conn.execute(insert(models.User).values(
+                name=f"Owner {pin}", email=f"owner{pin}@bench.com", password="x", role="owner", pin_code=pin,
+            )).inserted_primary_key[0]
+            restaurants[pin] = conn.execute(insert(models.Restaurant).values(
+                name=f"Kitchen {pin}", pin_code=pin, status="active", owner_id=owner_id,
+            )).inserted_primary_key[0]
+            for n in range(partners):
+                user_id = conn.execute(insert(models.User).values(
+                    name=f"Rider {pin}-{n}", email=f"rider{pin}-{n}@bench.com", password="x",
+                    role="delivery", pin_code=pin,
+                )).inserted_primary_key[0]
+                conn.execute(insert(models.DeliveryPartner).values(user_id=user_id, availability=True, pin_code=pin))
+    return customer_id, restaurants
+
+
+def place_orders(customer_id: int, restaurants: dict[str, int], per_pin: int):
+    with engine.begin() as conn:
+        conn.execute(insert(models.Order), [
+            {"customer_id": customer_id, "restaurant_id": rid, "total_amount": 100.0,
+             "payment_mode": "COD", "order_status": "Preparing"}
+            for rid in restaurants.values() for _ in range(per_pin)
+        ])
+
+
+def free_everyone():
+    db = SessionLocal()
+    busy = db.scalars(select(models.DeliveryPartner.id).where(models.DeliveryPartner.availability == False)).all()
+    for partner_id in busy:
+        dispatch.release_partner(db, partner_id)
+    db.execute(
+        update(models.Order).where(models.Order.order_status == "Out for Delivery").values(order_status="Delivered")
+    )
+    db.commit()
+    db.close()
+
+
+def preparing_orders(db, restaurant_id: int):
+    return (
+        db.query(models.Order)
+        .filter(models.Order.restaurant_id == restaurant_id, models.Order.order_status == "Preparing")
+        .order_by(models.Order.created_at, models.Order.id)
+        .all()
+    )
+
+
+def first_match(restaurants):
+    """The original update_order_status lookup: one order and one commit at a time."""
+    db = SessionLocal()
+    assigned = 0
+    for pin, rid in restaurants.items():
+        for order in preparing_orders(db, rid):
+            partner = (
+                db.query(models.DeliveryPartner)
+                .filter(models.DeliveryPartner.availability == True, models.DeliveryPartner.pin_code == pin)
+                .first()
+            )
+            if not partner:
+                continue
+            order.delivery_partner_id = partner.id
+            order.order_status = "Out for Delivery"
+            partner.availability = False
+            db.commit()
+            assigned += 1
+    db.close()
+    return assigned
+
+
+def round_robin(restaurants):
+    """update_order_status with dispatch.claim_partner, one order per commit."""
+    db = SessionLocal()
+    assigned = 0
+    for pin, rid in restaurants.items():
+        for order in preparing_orders(db, rid):
+            partner = dispatch.claim_partner(db, pin)
+            if not partner:
+                continue
+            order.delivery_partner_id = partner.id
+            order.order_status = "Out for Delivery"
+            db.commit()
+            assigned += 1
+    db.close()
+    return assigned
+
+
+def batch(restaurants):
+    """POST /api/owner/orders/dispatch: one claim and one commit per pin code."""
+    db = SessionLocal()
+    assigned = 0
+    for pin, rid in restaurants.items():
+        orders = preparing_orders(db, rid)
+        for order, partner in zip(orders, dispatch.claim_partners(db, pin, len(orders))):
+            order.delivery_partner_id = partner.id
+            order.order_status = "Out for Delivery"
+            assigned += 1
+        db.commit()
+    db.close()
+    return assigned
+
+
+STRATEGIES = {"first-match": first_match, "round-robin": round_robin, "batch": batch}
+
+
+def run(strategy, args) -> dict:
+    customer_id, restaurants = setup(args.pins, args.partners)
+    dispatch.rebuild_pool()
+    elapsed, assigned = 0.0, 0
+    for _ in range(args.rounds):
+        place_orders(customer_id, restaurants, args.orders)
+        start = time.perf_counter()
+        assigned += strategy(restaurants)
+        elapsed += time.perf_counter() - start
+        free_everyone()
+
+    with engine.connect() as conn:
+        per_partner = dict(conn.execute(
+            select(models.Order.delivery_partner_id, func.count())
+            .where(models.Order.delivery_partner_id.is_not(None))
+            .group_by(models.Order.delivery_partner_id)
+        ).all())
+        partner_ids = conn.scalars(select(models.DeliveryPartner.id)).all()
+    loads = [per_partner.get(pid, 0) for pid in partner_ids]
+    mean = statistics.mean(loads)
+    return {
+        "assigned": assigned,
+        "per_sec": assigned / elapsed if elapsed else 0.0,
+        "min": min(loads),
+        "max": max(loads),
+        "cv": statistics.pstdev(loads) / mean if mean else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark delivery-partner assignment strategies")
+    parser.add_argument("--pins", type=int, default=5)
+    parser.add_argument("--partners", type=int, default=20, help="partners per pin code")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=8, help="orders per pin code per round")
+    args = parser.parse_args()
+
+    print(f"{args.pins} pin codes × {args.partners} partners, {args.rounds} rounds × {args.orders} orders per pin code")
+    print(f"{'strategy':<12} {'assigned':>9} {'assign/s':>10} {'min':>5} {'max':>5} {'load CV':>8}")
+    for name, strategy in STRATEGIES.items():
+        r = run(strategy, args)
+        print(f"{name:<12} {r['assigned']:>9} {r['per_sec']:>10.0f} {r['min']:>5} {r['max']:>5} {r['cv']:>8.2f}")
+    os.remove(DB_FILE)
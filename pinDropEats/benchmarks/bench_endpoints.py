@@ -0,0 +1,249 @@
+"""
+Endpoint benchmark with latency and SQL statement budgets.
+Run: python benchmarks/bench_endpoints.py [--requests 100 --months 1 --orders-per-day 2000]
+     python benchmarks/bench_endpoints.py --update-baselines   # after an intended change
+
+Builds a throwaway database with generate.py and drives the app in-process with
+FastAPI's TestClient, startup hooks included. The accounts are the busiest
+generated customer and the owner of their most popular local restaurant, plus
+the seeded admin and care agent. Routes covered:
+- read paths: login, browse, menu, order listings per role, admin stats;
+- the order pipeline, one order at a time: two cart adds, checkout, accept,
+  preparing, out for delivery, then delivered by whichever partner was
+  assigned.
+
+For every route it prints p50/p95/p99 latency, requests/second (sequential,
+one client) and SQL statements per request. The results are then checked
+against benchmarks/baselines/endpoints.json:
+- a route that runs more statements than its baseline fails, and any failure
+  makes the exit status 1. Statement counts are deterministic, so this is the
+  regression gate;
+- a route whose p95 exceeds the baseline p95 × --tolerance plus --slack-ms
+  only gets a warning. The stored latencies come from whichever machine
+  recorded them. Add --fail-on-latency to make these failures too, when the
+  baselines were recorded on the same machine.
+
+Uses a throwaway SQLite file; the application database is never touched.
+"""
+import sys
+import os
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(prefix="pindrop-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+# Statement budgets count the warm path: a cached principal must not expire mid-run
+os.environ.setdefault("TOKEN_CACHE_TTL_SECONDS", "3600")
+
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "endpoints.json")
+PASSWORD = "password123"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from database import engine, async_engine, SessionLocal
+import generate
+import models
+
+
+class Bench:
+    """Times labelled requests and counts the SQL statements each one runs."""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.recording = True
+        self.latencies = defaultdict(list)
+        self.statements = defaultdict(list)
+        self._tokens = {}
+        self._count = 0
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_args):
+        self._count += 1
+
+    def auth(self, email: str) -> dict:
+        if email not in self._tokens:
+            r = self.client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+            r.raise_for_status()
+            self._tokens[email] = r.json()["access_token"]
+            # Untimed first use, so no timed request pays for loading the principal
+            self.client.get("/api/notifications/unread-count",
+                            headers={"Authorization": f"Bearer {self._tokens[email]}"})
+        return {"Authorization": f"Bearer {self._tokens[email]}"}
+
+    def request(self, label: str, method: str, url: str, **kwargs):
+        self._count = 0
+        start = time.perf_counter()
+        response = self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label}: {method} {url} → {response.status_code} {response.text[:200]}")
+        if self.recording:
+            self.latencies[label].append(elapsed * 1000)
+            self.statements[label].append(self._count)
+        return response
+
+
+def pick_accounts() -> dict:
+    """The busiest generated customer and the owner of their top local restaurant."""
+    o, u, r = models.Order, models.User, models.Restaurant
+    with SessionLocal() as db:
+        customer = db.execute(
+            select(u.email, u.pin_code).join(o, o.customer_id == u.id)
+            .group_by(u.id).order_by(func.count().desc(), u.id).limit(1)
+        ).one()
+        restaurant = db.execute(
+            select(r.id, u.email).join(u, r.owner_id == u.id).join(o, o.restaurant_id == r.id)
+            .where(r.pin_code == customer.pin_code)
+            .group_by(r.id).order_by(func.count().desc(), r.id).limit(1)
+        ).one()
+    return {
+        "customer": customer.email,
+        "owner": restaurant.email,
+        "restaurant_id": restaurant.id,
+        "admin": "admin@pindrop.com",
+        "care": "anita@care.com",
+    }
+
+
+def partner_email(order_id: int) -> str:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(models.User.email)
+            .join(models.DeliveryPartner, models.DeliveryPartner.user_id == models.User.id)
+            .join(models.Order, models.Order.delivery_partner_id == models.DeliveryPartner.id)
+            .where(models.Order.id == order_id)
+        )
+
+
+def read_paths(bench: Bench, accounts: dict, n: int):
+    customer, owner = bench.auth(accounts["customer"]), bench.auth(accounts["owner"])
+    admin, care = bench.auth(accounts["admin"]), bench.auth(accounts["care"])
+    rid = accounts["restaurant_id"]
+    for _ in range(n):
+        bench.request("login", "POST", "/api/auth/login", json={"email": accounts["customer"], "password": PASSWORD})
+        bench.request("browse restaurants", "GET", "/api/customer/restaurants", headers=customer)
+        bench.request("menu", "GET", f"/api/customer/restaurants/{rid}/menu", headers=customer)
+        bench.request("customer orders", "GET", "/api/customer/orders", headers=customer)
+        bench.request("owner orders", "GET", "/api/owner/orders", headers=owner)
+        bench.request("care orders", "GET", "/api/care/orders", headers=care)
+        bench.request("admin stats", "GET", "/api/admin/stats", headers=admin)
+
+
+def order_pipeline(bench: Bench, accounts: dict, n: int):
+    customer, owner = bench.auth(accounts["customer"]), bench.auth(accounts["owner"])
+    menu = bench.client.get(f"/api/customer/restaurants/{accounts['restaurant_id']}/menu", headers=customer).json()
+    dishes = [d["id"] for d in menu if d["availability"]][:2]
+    for _ in range(n):
+        for dish_id in dishes:
+            bench.request("cart add", "POST", "/api/customer/cart", headers=customer,
+                          json={"dish_id": dish_id, "quantity": 1})
+        order_id = bench.request("checkout", "POST", "/api/customer/checkout", headers=customer,
+                                 json={"payment_mode": "online"}).json()["id"]
+        for status in ("Accepted", "Preparing", "Out for Delivery"):
+            bench.request(f"status → {status}", "PUT", f"/api/owner/orders/{order_id}/status",
+                          headers=owner, json={"status": status})
+        partner = bench.auth(partner_email(order_id))
+        bench.request("partner orders", "GET", "/api/delivery/orders", headers=partner)
+        bench.request("delivered", "PUT", f"/api/delivery/orders/{order_id}/deliver", headers=partner)
+
+
+def summarize(bench: Bench) -> dict:
+    results = {}
+    for label, latencies in bench.latencies.items():
+        q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+        results[label] = {
+            "requests": len(latencies),
+            "p50_ms": round(q[49], 2),
+            "p95_ms": round(q[94], 2),
+            "p99_ms": round(q[98], 2),
+            "rps": round(len(latencies) / (sum(latencies) / 1000), 1),
+            "statements": max(bench.statements[label]),
+            "statements_mean": round(statistics.mean(bench.statements[label]), 2),
+        }
+    return results
+
+
+def check(results: dict, baselines: dict, tolerance: float, slack_ms: float) -> tuple[list[str], list[str]]:
+    """(statement budget failures, latency budget overruns)."""
+    statements, latency = [], []
+    for label, result in results.items():
+        budget = baselines.get(label)
+        if budget is None:
+            continue
+        if result["statements"] > budget["statements"]:
+            statements.append(f"{label}: {result['statements']} statements, budget {budget['statements']}")
+        limit = budget["p95_ms"] * tolerance + slack_ms
+        if result["p95_ms"] > limit:
+            latency.append(f"{label}: p95 {result['p95_ms']:.2f} ms, budget {limit:.2f} ms")
+    return statements, latency
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against stored budgets")
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed rounds before measuring")
+    parser.add_argument("--months", type=int, default=1, help="generated order history")
+    parser.add_argument("--orders-per-day", type=int, default=2000)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p95 growth factor")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="absolute p95 allowance on top")
+    parser.add_argument("--fail-on-latency", action="store_true",
+                        help="treat p95 overruns as failures (baselines recorded on this machine)")
+    parser.add_argument("--update-baselines", action="store_true", help="store this run as the new budgets")
+    args = parser.parse_args()
+
+    generate.generate(generate.build_parser().parse_args(
+        ["--months", str(args.months), "--orders-per-day", str(args.orders_per_day)]
+    ))
+    accounts = pick_accounts()
+
+    from main import app
+    with TestClient(app) as client:
+        bench = Bench(client)
+        bench.recording = False
+        read_paths(bench, accounts, args.warmup)
+        order_pipeline(bench, accounts, args.warmup)
+        bench.recording = True
+        read_paths(bench, accounts, args.requests)
+        order_pipeline(bench, accounts, args.requests)
+    results = summarize(bench)
+
+    print(f"\n{'route':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'SQL':>5} {'budget':>7}")
+    baselines = {}
+    if os.path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE) as f:
+            baselines = json.load(f)
+    for label, r in results.items():
+        budget = baselines.get(label, {}).get("statements", "-")
+        print(f"{label:<28} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['rps']:>8.0f} {r['statements']:>5} {budget:>7}")
+    os.remove(DB_FILE)
+
+    if args.update_baselines:
+        os.makedirs(os.path.dirname(BASELINES_FILE), exist_ok=True)
+        with open(BASELINES_FILE, "w") as f:
+            json.dump({label: {"p95_ms": r["p95_ms"], "statements": r["statements"]} for label, r in results.items()},
+                      f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nStored baselines in {os.path.relpath(BASELINES_FILE)}")
+    else:
+        failures, slow = check(results, baselines, args.tolerance, args.slack_ms)
+        if args.fail_on_latency:
+            failures, slow = failures + slow, []
+        if slow:
+            print("\nSlower than the stored p95 (a warning: those timings come from another run/machine):")
+            for warning in slow:
+                print(f"  ! {warning}")
+        if failures:
+            print("\nOver budget:")
+            for failure in failures:
+                print(f"  ✗ {failure}")
+            sys.exit(1)
+        print("\n✓ Every route within its SQL budget" if baselines else "\nNo baselines yet (run with --update-baselines)")
@@ -0,0 +1,138 @@
+"""
+Order export benchmark: streaming CSV/NDJSON vs materializing the listing.
+Run: python benchmarks/bench_export.py [--orders 1000000 --restaurants 50 --items 2 --materialize 50000]
+
+Fills a throwaway SQLite file with `--orders` orders (and `--items` items per
+order) using Core bulk inserts, then:
+- streams every order through export.iter_orders in both formats and reports
+  rows/s and MB/s;
+- reports peak Python memory (tracemalloc) of a CSV export of one restaurant
+  and of all orders, which should be about the same;
+- loads the first `--materialize` orders the way the paginated listing does
+  (eager-loaded ORM graph + OrderResponse) for comparison.
+
+Uses a throwaway SQLite file; the application database is never touched.
+"""
+import sys
+import os
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(prefix="pindrop-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from sqlalchemy import insert
+from database import engine, SessionLocal, Base
+import models
+import export
+from orders import query_orders, to_order_responses
+
+INSERT_CHUNK = 50000
+STATUSES = ["Delivered"] * 8 + ["Cancelled", "Rejected"]
+
+
+def setup(args) -> int:
+    """Fresh schema filled with synthetic orders; returns the first restaurant's id."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        customer_id = conn.execute(insert(models.User).values(
+            name="Bench Customer", email="bench@customer.com", password="x", role="customer", pin_code="110001",
+        )).inserted_primary_key[0]
+        restaurant_ids, dish_ids = [], {}
+        for n in range(args.restaurants):
+            owner_id = conn.execute(insert(models.User).values(
+                name=f"Owner {n}", email=f"owner{n}@bench.com", password="x", role="owner", pin_code="110001",
+            )).inserted_primary_key[0]
+            rid = conn.execute(insert(models.Restaurant).values(
+                name=f"Kitchen {n}", pin_code="110001", status="active", owner_id=owner_id,
+            )).inserted_primary_key[0]
+            restaurant_ids.append(rid)
+            dish_ids[rid] = [
+                conn.execute(insert(models.Dish).values(
+                    restaurant_id=rid, name=f"Dish {n}-{d}", price=100.0 + d * 20,
+                )).inserted_primary_key[0]
+                for d in range(8)
+            ]
+
+        start = datetime.utcnow() - timedelta(days=365)
+        step = timedelta(days=365) / args.orders
+        for first in range(0, args.orders, INSERT_CHUNK):
+            count = min(INSERT_CHUNK, args.orders - first)
+            rids = [rng.choice(restaurant_ids) for _ in range(count)]
+            conn.execute(insert(models.Order), [
+                {"id": first + k + 1, "customer_id": customer_id, "restaurant_id": rid,
+                 "total_amount": 250.0 * args.items, "restaurant_fee": 25.0, "payment_mode": "online",
+                 "order_status": rng.choice(STATUSES), "estimated_delivery_time": 35,
+                 "created_at": start + step * (first + k)}
+                for k, rid in enumerate(rids)
+            ])
+            conn.execute(insert(models.OrderItem), [
+                {"order_id": first + k + 1, "dish_id": rng.choice(dish_ids[rid]), "quantity": 1, "price": 250.0}
+                for k, rid in enumerate(rids) for _ in range(args.items)
+            ])
+    return restaurant_ids[0]
+
+
+def stream(fmt: str, restaurant_id: int = None) -> tuple[int, int]:
+    """Consume an export; returns (rows, bytes)."""
+    rows = size = 0
+    for chunk in export.iter_orders(fmt, restaurant_id):
+        size += len(chunk.encode())
+        rows += chunk.count("\n")
+    return rows - (fmt == "csv"), size
+
+
+def traced_peak(job) -> float:
+    tracemalloc.start()
+    job()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def materialize(limit: int):
+    db = SessionLocal()
+    try:
+        orders = query_orders(db).order_by(models.Order.created_at, models.Order.id).limit(limit).all()
+        return to_order_responses(orders)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming order export")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--items", type=int, default=2, help="items per order")
+    parser.add_argument("--materialize", type=int, default=50000, help="orders loaded through the listing path")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    first_restaurant = setup(args)
+    print(f"Loaded {args.orders} orders × {args.items} items in {time.perf_counter() - t:.1f}s")
+
+    print(f"{'export':<24} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'MB/s':>7}")
+    for fmt in export.FORMATS:
+        t = time.perf_counter()
+        rows, size = stream(fmt)
+        elapsed = time.perf_counter() - t
+        print(f"{'stream ' + fmt:<24} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>9.0f} {size / 2**20 / elapsed:>7.1f}")
+    t = time.perf_counter()
+    materialize(args.materialize)
+    elapsed = time.perf_counter() - t
+    print(f"{'listing (ORM + schema)':<24} {args.materialize:>9} {elapsed:>8.2f} {args.materialize / elapsed:>9.0f}")
+
+    print("\nPeak Python memory (tracemalloc)")
+    print(f"  stream csv, one restaurant  {traced_peak(lambda: stream('csv', first_restaurant)):8.1f} MiB")
+    print(f"  stream csv, all orders      {traced_peak(lambda: stream('csv')):8.1f} MiB")
+    print(f"  listing, {args.materialize} orders     {traced_peak(lambda: materialize(args.materialize)):8.1f} MiB")
+    os.remove(DB_FILE)
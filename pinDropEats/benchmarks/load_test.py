@@ -0,0 +1,342 @@
+"""
+Closed-loop load test against a running server, covering all five roles.
+Run: python benchmarks/load_test.py [--url http://localhost:8000 --users 10,25,50,100 --duration 30]
+
+Start the server on a generated database first, without --reload:
+    cd backend && python generate.py && uvicorn main:app --port 8000 --workers 1
+
+Virtual users loop until the stage ends. Each waits for its response (and
+an optional --think pause) before its next request. Users are split by --mix:
+- customers: browse their area, open a menu, add 1–3 dishes, check out, list
+  their orders, check unread notifications;
+- owners: list their restaurant's orders and move every one a step along
+  Placed → Accepted (or Rejected) → Preparing → Out for Delivery;
+- partners: list their deliveries and mark the ones on the road delivered;
+- care agents: list orders and cancel an open one now and then;
+- admins: read the dashboard counters and hourly analytics.
+Owners and partners work through every account in the chosen --pins in
+turn, so orders keep flowing whatever the user count. Accounts follow
+generate.py's naming (customerN / ownerRID / riderPID @gen.pindrop.com,
+password123).
+
+Each stage in --users runs for --duration seconds. For each stage it prints:
+- a timeline per --interval: requests/s, error %, p50/p95 latency,
+  checkouts/s and deliveries/s;
+- per-action latency and error counts;
+- the most frequent errors, e.g. "No delivery partner available" or 500s.
+  Server-side causes such as SQLite "database is locked" appear in the
+  server log.
+The final table marks the first stage past --max-error-rate or --max-p95-ms.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from itertools import count
+import httpx
+
+EMAIL_DOMAIN = "gen.pindrop.com"  # generate.EMAIL_DOMAIN
+PASSWORD = "password123"
+ROLES = ("customer", "owner", "delivery", "care", "admin")
+OWNER_STEPS = {"Placed": "Accepted", "Accepted": "Preparing", "Preparing": "Out for Delivery"}
+CANCELLABLE = ("Placed", "Accepted", "Preparing")
+REJECT_RATE = 0.03
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+class Recorder:
+    """Every request of one stage: (seconds since start, action, status, ms, error)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.samples = []
+
+    async def call(self, client: httpx.AsyncClient, action: str, method: str, url: str, token: str, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        except httpx.HTTPError as e:
+            self.samples.append((time.perf_counter() - self.start, action, 0, (time.perf_counter() - t0) * 1000,
+                                 f"{type(e).__name__}"))
+            return None
+        error = None
+        if response.status_code >= 400:
+            try:
+                error = response.json().get("detail")
+            except ValueError:
+                error = response.text[:80]
+            error = f"{response.status_code} {error if isinstance(error, str) else 'validation error'}"
+        self.samples.append((time.perf_counter() - self.start, action, response.status_code,
+                             (time.perf_counter() - t0) * 1000, error))
+        return response if error is None else None
+
+
+# ── Accounts ─────────────────────────────────────────
+async def login(client: httpx.AsyncClient, email: str):
+    r = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    return r.json()["access_token"] if r.status_code == 200 else None
+
+
+async def gather_limited(coros, limit: int = 16):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+async def load_accounts(client: httpx.AsyncClient, pins: set[str], customers_needed: int) -> dict:
+    admin = await login(client, "admin@pindrop.com")
+    care = await login(client, "anita@care.com")
+    if not admin or not care:
+        raise SystemExit("Seeded admin/care accounts missing — run generate.py first")
+
+    async def customer(n):
+        token = await login(client, f"customer{n}@{EMAIL_DOMAIN}")
+        if token:
+            me = (await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})).json()
+            return token if me["pin_code"] in pins else None
+        return "missing"
+
+    customers = []
+    for first in count(0, 200):
+        found = await gather_limited(customer(n) for n in range(first, first + 200))
+        customers += [t for t in found if t and t != "missing"]
+        if len(customers) >= customers_needed or "missing" in found:
+            break
+
+    restaurants = (await client.get("/api/admin/restaurants", headers={"Authorization": f"Bearer {admin}"})).json()
+    owners = await gather_limited(
+        login(client, f"owner{r['id']}@{EMAIL_DOMAIN}") for r in restaurants if r["pin_code"] in pins
+    )
+
+    async def partner(pid):
+        token = await login(client, f"rider{pid}@{EMAIL_DOMAIN}")
+        if token:
+            status = (await client.get("/api/delivery/status", headers={"Authorization": f"Bearer {token}"})).json()
+            return token if status["pin_code"] in pins else None
+        return "missing"
+
+    partners = []
+    for first in count(1, 50):
+        found = await gather_limited(partner(pid) for pid in range(first, first + 50))
+        partners += [t for t in found if t and t != "missing"]
+        if found.count("missing") == len(found):
+            break
+    return {
+        "customer": customers[:customers_needed],
+        "owner": [t for t in owners if t],
+        "delivery": partners,
+        "care": [care],
+        "admin": [admin],
+    }
+
+
+# ── Virtual users ────────────────────────────────────
+async def customer_user(client, rec: Recorder, tokens: list[str], deadline: float, rng: random.Random, think: float):
+    token = tokens[0]
+    while time.perf_counter() < deadline:
+        r = await rec.call(client, "browse", "GET", "/api/customer/restaurants", token)
+        if r and r.json():
+            restaurant = rng.choice(r.json())
+            menu = await rec.call(client, "menu", "GET", f"/api/customer/restaurants/{restaurant['id']}/menu", token)
+            dishes = [d for d in (menu.json() if menu else []) if d["availability"]]
+            for dish in rng.sample(dishes, min(rng.randint(1, 3), len(dishes))):
+                added = await rec.call(client, "cart add", "POST", "/api/customer/cart", token,
+                                       json={"dish_id": dish["id"], "quantity": rng.randint(1, 2)})
+                if added is None:
+                    await rec.call(client, "cart clear", "DELETE", "/api/customer/cart", token)
+                    break
+            else:
+                await rec.call(client, "checkout", "POST", "/api/customer/checkout", token,
+                               json={"payment_mode": rng.choice(["online", "COD"])})
+        await rec.call(client, "my orders", "GET", "/api/customer/orders", token)
+        await rec.call(client, "unread count", "GET", "/api/notifications/unread-count", token)
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+async def owner_user(client, rec: Recorder, tokens: list[str], deadline: float, rng: random.Random, think: float):
+    for token in _cycle(tokens, rng):
+        if time.perf_counter() >= deadline:
+            return
+        r = await rec.call(client, "owner orders", "GET", "/api/owner/orders", token)
+        for order in (r.json()["items"] if r else []):
+            status = OWNER_STEPS.get(order["order_status"])
+            if status is None or time.perf_counter() >= deadline:
+                continue
+            if status == "Accepted" and rng.random() < REJECT_RATE:
+                status = "Rejected"
+            await rec.call(client, f"status → {status}", "PUT", f"/api/owner/orders/{order['id']}/status", token,
+                           json={"status": status})
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+async def delivery_user(client, rec: Recorder, tokens: list[str], deadline: float, rng: random.Random, think: float):
+    for token in _cycle(tokens, rng):
+        if time.perf_counter() >= deadline:
+            return
+        r = await rec.call(client, "partner orders", "GET", "/api/delivery/orders", token)
+        for order in (r.json()["items"] if r else []):
+            if order["order_status"] == "Out for Delivery":
+                await rec.call(client, "delivered", "PUT", f"/api/delivery/orders/{order['id']}/deliver", token)
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+async def care_user(client, rec: Recorder, tokens: list[str], deadline: float, rng: random.Random, think: float):
+    token = tokens[0]
+    while time.perf_counter() < deadline:
+        r = await rec.call(client, "care orders", "GET", "/api/care/orders", token)
+        open_orders = [o for o in (r.json()["items"] if r else []) if o["order_status"] in CANCELLABLE]
+        if open_orders and rng.random() < 0.2:
+            await rec.call(client, "cancel", "PUT", f"/api/care/orders/{rng.choice(open_orders)['id']}/cancel", token)
+        await rec.call(client, "complaints", "GET", "/api/care/complaints", token)
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+async def admin_user(client, rec: Recorder, tokens: list[str], deadline: float, rng: random.Random, think: float):
+    token = tokens[0]
+    while time.perf_counter() < deadline:
+        await rec.call(client, "admin stats", "GET", "/api/admin/stats", token)
+        await rec.call(client, "analytics", "GET", "/api/admin/analytics?granularity=hour", token)
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+
+
+def _cycle(tokens: list[str], rng: random.Random):
+    tokens = tokens[:]
+    rng.shuffle(tokens)
+    while tokens:
+        yield from tokens
+
+
+USERS = {"customer": customer_user, "owner": owner_user, "delivery": delivery_user, "care": care_user, "admin": admin_user}
+
+
+def split_users(total: int, mix: dict[str, int]) -> dict[str, int]:
+    """Users per role in proportion to `mix`, at least one for every weighted role."""
+    weight = sum(mix.values())
+    counts = {role: max(1, round(total * w / weight)) for role, w in mix.items() if w}
+    counts["customer"] = max(1, counts.get("customer", 0) + total - sum(counts.values()))
+    return counts
+
+
+async def run_stage(args, accounts: dict, users: int, rng: random.Random) -> Recorder:
+    counts = split_users(users, args.mix)
+    rec = Recorder()
+    deadline = rec.start + args.duration
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        for role, n in counts.items():
+            pool = accounts[role]
+            for i in range(n):
+                # Owners and partners each cycle through a share of the accounts
+                share = pool[i::n] if role in ("owner", "delivery") else [pool[i % len(pool)]]
+                if share:
+                    tasks.append(USERS[role](client, rec, share, deadline, random.Random(rng.random()), args.think))
+        await asyncio.gather(*tasks)
+    rec.counts = counts
+    return rec
+
+
+# ── Reporting ────────────────────────────────────────
+def report(rec: Recorder, users: int, duration: float, interval: float) -> dict:
+    samples = rec.samples
+    print(f"\n═══ {users} users ({', '.join(f'{n} {r}' for r, n in rec.counts.items())}) ═══")
+    print(f"{'t (s)':>6} {'req/s':>8} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'checkout/s':>11} {'deliver/s':>10}")
+    windows = defaultdict(list)
+    last = max(math.ceil(duration / interval) - 1, 0)  # requests still in flight at the deadline count here
+    for sample in samples:
+        windows[min(int(sample[0] // interval), last)].append(sample)
+    for w in sorted(windows):
+        ws = windows[w]
+        ok = [s for s in ws if s[4] is None]
+        lat = [s[3] for s in ws]
+        print(f"{(w + 1) * interval:>6.0f} {len(ws) / interval:>8.1f} {100 * (len(ws) - len(ok)) / len(ws):>6.1f} "
+              f"{percentile(lat, 50):>8.1f} {percentile(lat, 95):>8.1f} "
+              f"{sum(s[1] == 'checkout' for s in ok) / interval:>11.1f} "
+              f"{sum(s[1] == 'delivered' for s in ok) / interval:>10.1f}")
+
+    print(f"\n{'action':<28} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    by_action = defaultdict(list)
+    for sample in samples:
+        by_action[sample[1]].append(sample)
+    for action, ss in sorted(by_action.items(), key=lambda kv: -len(kv[1])):
+        lat = [s[3] for s in ss]
+        print(f"{action:<28} {len(ss):>9} {sum(s[4] is not None for s in ss):>7} "
+              f"{percentile(lat, 50):>8.1f} {percentile(lat, 95):>8.1f} {percentile(lat, 99):>8.1f}")
+
+    errors = Counter(f"{s[1]}: {s[4]}" for s in samples if s[4] is not None)
+    if errors:
+        print("\nErrors")
+        for error, n in errors.most_common(8):
+            print(f"  {n:>6} × {error}")
+
+    elapsed = max((s[0] for s in samples), default=1.0)
+    failed = sum(s[4] is not None for s in samples)
+    return {
+        "users": users,
+        "rps": len(samples) / elapsed,
+        "error_rate": failed / len(samples) if samples else 0.0,
+        "p95": percentile([s[3] for s in samples], 95),
+        "checkouts": sum(s[1] == "checkout" and s[4] is None for s in samples) / elapsed,
+        "deliveries": sum(s[1] == "delivered" and s[4] is None for s in samples) / elapsed,
+        "server_errors": sum(s[2] >= 500 or s[2] == 0 for s in samples),
+    }
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {role: 0 for role in ROLES}
+    for part in text.split(","):
+        role, _, weight = part.partition("=")
+        if role not in mix:
+            raise argparse.ArgumentTypeError(f"unknown role '{role}'")
+        mix[role] = int(weight)
+    return mix
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    pins = set(args.pins.split(","))
+    most_users = max(args.users)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        accounts = await load_accounts(client, pins, split_users(most_users, args.mix).get("customer", 1))
+    print(f"Accounts in {sorted(pins)}: " + ", ".join(f"{len(v)} {k}" for k, v in accounts.items()))
+    if not accounts["customer"] or not accounts["owner"] or not accounts["delivery"]:
+        raise SystemExit("No generated customers/owners/partners in these pin codes — run generate.py first")
+
+    summaries = [report(await run_stage(args, accounts, users, rng), users, args.duration, args.interval) for users in args.users]
+
+    print(f"\n{'users':>6} {'req/s':>8} {'err %':>6} {'p95 ms':>8} {'checkout/s':>11} {'deliver/s':>10} {'5xx':>5}")
+    broken = False
+    for s in summaries:
+        over = s["error_rate"] > args.max_error_rate or s["p95"] > args.max_p95_ms
+        mark = "  ✗ past limits" if over and not broken else ""
+        broken = broken or over
+        print(f"{s['users']:>6} {s['rps']:>8.1f} {100 * s['error_rate']:>6.1f} {s['p95']:>8.1f} "
+              f"{s['checkouts']:>11.1f} {s['deliveries']:>10.1f} {s['server_errors']:>5}{mark}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed-loop multi-role load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=lambda s: [int(n) for n in s.split(",")], default=[10, 25, 50, 100],
+                        help="concurrent users per stage, comma-separated")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per stage")
+    parser.add_argument("--interval", type=float, default=5, help="timeline resolution in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("customer=6,owner=2,delivery=2,care=1,admin=1"))
+    parser.add_argument("--pins", default="110001,110002,110003", help="pin codes the users live and work in")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between iterations (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout (s)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-p95-ms", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -87,6 +87,45 @@ async function apiDelete(endpoint) {
     return api(endpoint, { method: 'DELETE' });
 }
 
+// ── Paged Listings ──────────────────────────────────
+// Listing endpoints return { items, next_cursor }. A page state holds the rows
+// fetched so far and the cursor for the next request (null once exhausted).
+function pageUrl(endpoint, cursor, limit) {
+    const params = new URLSearchParams();
+    if (limit) params.set('limit', limit);
+    if (cursor) params.set('after', cursor);
+    const qs = params.toString();
+    return qs ? `${endpoint}${endpoint.includes('?') ? '&' : '?'}${qs}` : endpoint;
+}
+
+function newPage() {
+    return { items: [], cursor: null };
+}
+
+async function loadNextPage(endpoint, page) {
+    const data = await apiGet(pageUrl(endpoint, page.cursor));
+    page.items = page.items.concat(data.items);
+    page.cursor = data.next_cursor;
+    return page.items;
+}
+
+// Every row, following next_cursor in pages of 200 (the API maximum)
+async function apiGetAll(endpoint) {
+    let items = [];
+    let cursor = null;
+    do {
+        const data = await apiGet(pageUrl(endpoint, cursor, 200));
+        items = items.concat(data.items);
+        cursor = data.next_cursor;
+    } while (cursor);
+    return items;
+}
+
+function loadMoreButton(page, onclick) {
+    if (!page.cursor) return '';
+    return `<div class="text-center mt-2"><button class="btn btn-outline" onclick="${onclick}">Load more</button></div>`;
+}
+
 // ── Toast Notification ──────────────────────────────
 function showToast(message, type = 'info') {
     let container = document.getElementById('toast-container');
@@ -197,31 +236,93 @@ function renderNavbar(user) {
     </nav>`;
 }
 
+let notifCache = [];
+let unreadCount = 0;
+let notifStream = null;
+
 async function loadNotifications() {
     try {
-        const notifs = await apiGet('/api/notifications');
-        const unread = notifs.filter(n => !n.is_read).length;
-        const badge = document.getElementById('notif-count');
-        if (badge) {
-            badge.textContent = unread;
-            badge.style.display = unread > 0 ? 'inline' : 'none';
-        }
-        const dropdown = document.getElementById('notif-dropdown');
-        if (dropdown) {
-            if (notifs.length === 0) {
-                dropdown.innerHTML = '<div class="notif-item text-muted">No notifications</div>';
-            } else {
-                dropdown.innerHTML = notifs.map(n => `
-                    <div class="notif-item ${n.is_read ? '' : 'unread'}">
-                        <div>${n.message}</div>
-                        <div class="notif-time">${formatDate(n.created_at)}</div>
-                    </div>
-                `).join('');
-            }
+        const [page, count] = await Promise.all([
+            apiGet('/api/notifications?limit=20'),
+            apiGet('/api/notifications/unread-count'),
+        ]);
+        notifCache = page.items;
+        unreadCount = count.unread;
+        renderNotifications();
+    } catch (e) {}
+    startNotificationStream();
+}
+
+// The badge comes from the server-side counter, which also covers unread
+// notifications older than the 20 in the dropdown.
+function renderBadge() {
+    const badge = document.getElementById('notif-count');
+    if (badge) {
+        badge.textContent = unreadCount;
+        badge.style.display = unreadCount > 0 ? 'inline' : 'none';
+    }
+}
+
+// Polling fallback: one cheap count per tick, the list only when it changed
+async function pollUnreadCount() {
+    try {
+        const { unread } = await apiGet('/api/notifications/unread-count');
+        if (unread !== unreadCount) {
+            await loadNotifications();
         }
     } catch (e) {}
 }
 
+function renderNotifications() {
+    const notifs = notifCache;
+    renderBadge();
+    const dropdown = document.getElementById('notif-dropdown');
+    if (dropdown) {
+        if (notifs.length === 0) {
+            dropdown.innerHTML = '<div class="notif-item text-muted">No notifications</div>';
+        } else {
+            dropdown.innerHTML = notifs.map(n => `
+                <div class="notif-item ${n.is_read ? '' : 'unread'}">
+                    <div>${n.message}</div>
+                    <div class="notif-time">${formatDate(n.created_at)}</div>
+                </div>
+            `).join('');
+        }
+    }
+}
+
+// New notifications are pushed over Server-Sent Events; polling is only the
+// fallback for browsers without EventSource. The stream is opened with a
+// short-lived ticket so the access token never appears in a URL.
+async function startNotificationStream() {
+    if (notifStream || !getToken()) return;
+    if (!window.EventSource) {
+        notifStream = setInterval(pollUnreadCount, 15000);
+        return;
+    }
+    notifStream = 'connecting';
+    let ticket;
+    try {
+        ticket = (await apiPost('/api/notifications/stream-ticket', {})).ticket;
+    } catch (e) {
+        notifStream = null;
+        return;
+    }
+    notifStream = new EventSource(`${API_BASE}/api/notifications/stream?ticket=${encodeURIComponent(ticket)}`);
+    notifStream.addEventListener('notification', (e) => {
+        notifCache = [JSON.parse(e.data), ...notifCache].slice(0, 20);
+        unreadCount += 1;
+        renderNotifications();
+    });
+    // The ticket expires soon after connecting, so the browser's own retry
+    // would be refused: reconnect with a new ticket and catch up instead.
+    notifStream.onerror = () => {
+        notifStream.close();
+        notifStream = null;
+        setTimeout(loadNotifications, 5000);
+    };
+}
+
 async function toggleNotifications() {
     const dd = document.getElementById('notif-dropdown');
     if (dd.classList.contains('show')) {
@@ -229,8 +330,9 @@ async function toggleNotifications() {
     } else {
         dd.classList.add('show');
         await apiPut('/api/notifications/read');
-        const badge = document.getElementById('notif-count');
-        if (badge) { badge.style.display = 'none'; badge.textContent = '0'; }
+        notifCache.forEach(n => { n.is_read = true; });
+        unreadCount = 0;
+        renderBadge();
     }
 }
 
@@ -242,5 +344,3 @@ document.addEventListener('click', (e) => {
     }
 });
 
-// Auto-refresh notifications every 15 seconds
-setInterval(loadNotifications, 15000);
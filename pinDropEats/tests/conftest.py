@@ -0,0 +1,74 @@
+"""
+Shared fixtures: the app on a throwaway SQLite file loaded with the seed data.
+Run: python -m pytest tests
+
+The database is seeded once per session, so tests create the orders they need
+instead of relying on each other's state.
+"""
+import sys
+import os
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(prefix="pindrop-test-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+import pytest
+from fastapi.testclient import TestClient
+
+PASSWORD = "password123"
+
+
+@pytest.fixture(scope="session")
+def client():
+    import seed
+    from database import SessionLocal
+    from stats import rebuild_stats
+    from analytics import rebuild_rollups
+
+    seed.reset_schema()
+    db = SessionLocal()
+    try:
+        seed.seed_sample_data(db)
+        rebuild_stats(db)
+        rebuild_rollups(db)
+        db.commit()
+    finally:
+        db.close()
+
+    from main import app
+    # Startup hooks load the dispatch pool, ETA model and platform stats
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def auth(client):
+    """auth(email) → Authorization header for that seeded account."""
+    tokens = {}
+
+    def headers(email: str) -> dict:
+        if email not in tokens:
+            r = client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+            assert r.status_code == 200, r.text
+            tokens[email] = r.json()["access_token"]
+        return {"Authorization": f"Bearer {tokens[email]}"}
+
+    return headers
+
+
+@pytest.fixture(scope="session")
+def place_order(client, auth):
+    """place_order(customer, owner) → id of a new order at the owner's restaurant."""
+
+    def place(customer: str, owner: str) -> int:
+        dish = client.get("/api/owner/dishes", headers=auth(owner)).json()[0]
+        r = client.post("/api/customer/cart", headers=auth(customer), json={"dish_id": dish["id"], "quantity": 1})
+        assert r.status_code == 200, r.text
+        r = client.post("/api/customer/checkout", headers=auth(customer), json={"payment_mode": "online"})
+        assert r.status_code == 200, r.text
+        return r.json()["id"]
+
+    return place
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+ADMIN = "admin@pindrop.com"
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def analytics(client, auth, **params):
+    return client.get("/api/admin/analytics", headers=auth(ADMIN), params=params)
+
+
+def iso(naive_utc: datetime, tz=timezone.utc) -> str:
+    return naive_utc.replace(tzinfo=timezone.utc).astimezone(tz).isoformat()
+
+
+def test_bounds_with_an_offset_are_accepted(client, auth):
+    r = analytics(client, auth, start="2026-09-01T00:00:00Z")
+    assert r.status_code == 200, r.text
+    r = analytics(client, auth, start="2026-09-01T00:00:00+05:30", granularity="hour")
+    assert r.status_code == 200, r.text
+    # 00:30 UTC, after the naive (UTC) end
+    r = analytics(client, auth, start="2026-09-01T06:00:00+05:30", end="2026-09-01T00:00:00")
+    assert r.status_code == 400
+
+
+def test_bounds_with_an_offset_are_read_as_utc(client, auth, place_order):
+    place_order("amit@customer.com", "raj@restaurant.com")
+    now = datetime.utcnow()
+    hour = now.replace(minute=0, second=0, microsecond=0)
+
+    # Ends two hours ago; read as wall time, +05:30 would reach 3.5 hours ahead
+    r = analytics(client, auth, granularity="hour", start=iso(hour - timedelta(hours=3)),
+                  end=iso(now - timedelta(hours=2), IST))
+    assert r.status_code == 200, r.text
+    assert all(datetime.fromisoformat(b["bucket"]) < hour for b in r.json())
+
+    r = analytics(client, auth, granularity="hour", start=iso(hour - timedelta(hours=1), IST),
+                  end=iso(now + timedelta(hours=1), IST))
+    buckets = {datetime.fromisoformat(b["bucket"]): b for b in r.json()}
+    assert buckets[hour]["orders"] >= 1
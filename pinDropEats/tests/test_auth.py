@@ -0,0 +1,33 @@
+import auth
+import models
+from database import SessionLocal
+
+EMAIL = "neha@customer.com"
+
+
+def rename(name: str):
+    with SessionLocal() as db:
+        db.query(models.User).filter(models.User.email == EMAIL).one().name = name
+        db.commit()
+
+
+def test_principal_loaded_before_a_committed_change_is_not_cached(client, monkeypatch):
+    r = client.post("/api/auth/login", json={"email": EMAIL, "password": "password123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    original = r.json()["user"]["name"]
+    load_principal = auth._load_principal
+
+    async def load_then_change(payload, db):
+        # The row is read, then a profile change commits before it is cached
+        principal = await load_principal(payload, db)
+        rename("Neha Renamed")
+        return principal
+
+    try:
+        with monkeypatch.context() as m:
+            m.setattr(auth, "_load_principal", load_then_change)
+            assert client.get("/api/auth/me", headers=headers).json()["name"] == original
+
+        assert client.get("/api/auth/me", headers=headers).json()["name"] == "Neha Renamed"
+    finally:
+        rename(original)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import dispatch
+import models
+import routers.restaurant_owner
+from database import SessionLocal
+
+CUSTOMER = "amit@customer.com"
+OWNER = "raj@restaurant.com"
+
+
+def preparing_order(client, auth, place_order) -> int:
+    """A fresh order at the owner's restaurant, moved to Preparing."""
+    order_id = place_order(CUSTOMER, OWNER)
+    for status in ("Accepted", "Preparing"):
+        r = client.put(f"/api/owner/orders/{order_id}/status", headers=auth(OWNER), json={"status": status})
+        assert r.status_code == 200, r.text
+    return order_id
+
+
+def test_partner_claimed_by_failed_request_can_be_claimed_again(client, auth, place_order, monkeypatch):
+    owner = auth(OWNER)
+    order_id = preparing_order(client, auth, place_order)
+    available = dispatch.pool.counts()
+
+    def fail(*_args):
+        raise RuntimeError("handler failed after claiming a partner")
+
+    with monkeypatch.context() as m:
+        m.setattr(routers.restaurant_owner, "set_status", fail)
+        r = client.put(f"/api/owner/orders/{order_id}/status", headers=owner, json={"status": "Out for Delivery"})
+    assert r.status_code == 500
+    assert dispatch.pool.counts() == available
+
+    r = client.put(f"/api/owner/orders/{order_id}/status", headers=owner, json={"status": "Out for Delivery"})
+    assert r.status_code == 200, r.text
+    r = client.get(f"/api/customer/orders/{order_id}", headers=auth(CUSTOMER))
+    assert r.json()["delivery_partner_id"] is not None
+
+
+def test_balance_counts_only_orders_in_the_window():
+    with SessionLocal() as db:
+        partner_id = db.query(models.DeliveryPartner.id).first()[0]
+        customer_id = db.query(models.User.id).filter(models.User.email == CUSTOMER).scalar()
+        restaurant_id = db.query(models.Restaurant.id).first()[0]
+        before = dispatch._delivery_counts(db, [partner_id]).get(partner_id, 0)
+
+        window = timedelta(hours=dispatch.DISPATCH_BALANCE_WINDOW_HOURS)
+        for age in (timedelta(0), window + timedelta(hours=1)):
+            db.add(models.Order(
+                customer_id=customer_id, restaurant_id=restaurant_id, total_amount=100,
+                order_status="Delivered", delivery_partner_id=partner_id,
+                created_at=datetime.utcnow() - age,
+            ))
+        db.flush()
+        assert dispatch._delivery_counts(db, [partner_id]).get(partner_id, 0) == before + 1
+        db.rollback()
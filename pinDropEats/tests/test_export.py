@@ -0,0 +1,31 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+OWNER = "raj@restaurant.com"
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def exported_ids(client, auth, **params) -> set[int]:
+    r = client.get("/api/owner/orders/export", headers=auth(OWNER), params={"format": "csv", **params})
+    assert r.status_code == 200, r.text
+    return {int(row["id"]) for row in csv.DictReader(io.StringIO(r.text))}
+
+
+def test_mixed_offset_and_naive_bounds(client, auth):
+    for path in ("/api/owner/orders/export", "/api/admin/orders/export"):
+        headers = auth(OWNER if "owner" in path else "admin@pindrop.com")
+        r = client.get(path, headers=headers, params={"start": "2026-09-01T00:00:00Z", "end": "2026-10-01T00:00:00"})
+        assert r.status_code == 200, r.text
+        # 00:30 UTC, after the naive (UTC) end
+        r = client.get(path, headers=headers, params={"start": "2026-09-01T06:00:00+05:30", "end": "2026-09-01T00:00:00"})
+        assert r.status_code == 400
+
+
+def test_bounds_with_an_offset_are_read_as_utc(client, auth, place_order):
+    order_id = place_order("amit@customer.com", OWNER)
+    now = datetime.now(timezone.utc)
+
+    # Ends an hour ago; read as wall time, +05:30 would reach 4.5 hours ahead
+    assert order_id not in exported_ids(client, auth, end=(now - timedelta(hours=1)).astimezone(IST).isoformat())
+    assert order_id in exported_ids(client, auth, start=(now - timedelta(hours=1)).astimezone(IST).isoformat())
@@ -0,0 +1,39 @@
+import asyncio
+
+import metrics
+
+
+def run(headers: list) -> int:
+    """Serve one request through MetricsMiddleware; return in-flight while the body is being sent."""
+    seen = {}
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        seen["in_flight"] = metrics.HTTP_IN_FLIGHT.value
+        await send({"type": "http.response.body", "body": b"data", "more_body": False})
+
+    async def send(_message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/stream"}
+    asyncio.run(metrics.MetricsMiddleware(app)(scope, None, send))
+    return seen["in_flight"]
+
+
+def test_streamed_response_leaves_in_flight_once_started():
+    before = metrics.HTTP_IN_FLIGHT.value
+    assert run([(b"content-type", b"text/event-stream")]) == before
+    assert metrics.HTTP_IN_FLIGHT.value == before
+
+
+def test_sized_response_counts_until_sent():
+    before = metrics.HTTP_IN_FLIGHT.value
+    assert run([(b"content-length", b"4")]) == before + 1
+    assert metrics.HTTP_IN_FLIGHT.value == before
+
+
+def test_streamed_response_is_counted_once():
+    requests = metrics.HTTP_REQUESTS.labels("GET", metrics.UNMATCHED_ROUTE, "200")
+    before = requests.value
+    run([])
+    assert requests.value == before + 1
@@ -0,0 +1,34 @@
+import pytest
+
+import models
+import notifications
+from database import SessionLocal
+
+CUSTOMER = "amit@customer.com"
+
+
+@pytest.mark.parametrize("path", ["/api/notifications/read", "/api/customer/notifications/read"])
+def test_notification_committed_during_mark_read_stays_counted(client, auth, monkeypatch, path):
+    headers = auth(CUSTOMER)
+    with SessionLocal() as db:
+        user_id = db.query(models.User.id).filter(models.User.email == CUSTOMER).scalar()
+    client.get("/api/notifications/unread-count", headers=headers)  # cache the count
+
+    invalidate = notifications.unread.invalidate
+
+    def notify_then_invalidate(uid):
+        # Another request commits a notification after the UPDATE has committed
+        with SessionLocal() as db:
+            notifications.create_notification(db, uid, "Arrived mid-request")
+            db.commit()
+        invalidate(uid)
+
+    with monkeypatch.context() as m:
+        m.setattr(notifications.unread, "invalidate", notify_then_invalidate)
+        r = client.put(path, headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.get("/api/notifications/unread-count", headers=headers)
+    assert r.json()["unread"] == 1
+    with SessionLocal() as db:
+        assert db.query(models.Notification).filter_by(user_id=user_id, is_read=False).count() == 1